@@ -8,32 +8,50 @@ import os
 import shutil
 import subprocess
 import tempfile
+import threading
 import time
 
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
 from pathlib import Path
 
 import boto3
+import boto3.s3.transfer
 import botocore
+import botocore.config
 import jinja2  # pypi: Jinja2
-import sh
-
-from decouple import config
 
 import distillery
+import settings
 
-logging.config.fileConfig(
-    # set the logging configuration in the settings.ini file
-    Path(Path(__file__).resolve().parent).joinpath("settings.ini"),
-    disable_existing_loggers=False,
-)
 logger = logging.getLogger(__name__)
 
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=config("DISTILLERY_AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=config("DISTILLERY_AWS_SECRET_ACCESS_KEY"),
-)
+
+@distillery.per_process
+def get_s3_client():
+    return boto3.client(
+        "s3",
+        aws_access_key_id=settings.get_settings().distillery_aws_access_key_id,
+        aws_secret_access_key=settings.get_settings().distillery_aws_secret_access_key,
+    )
+
+
+@distillery.per_process
+def get_publish_client():
+    """Return the client shared by all archival objects publishing access files."""
+    return boto3.client(
+        "s3",
+        aws_access_key_id=settings.get_settings().distillery_aws_access_key_id,
+        aws_secret_access_key=settings.get_settings().distillery_aws_secret_access_key,
+        config=botocore.config.Config(
+            max_pool_connections=settings.get_settings().alchemist_publish_workers
+        ),
+    )
+
 
 linked_agent_archival_record_relators = {
     "abr": "Abridger",
@@ -346,90 +364,260 @@ class AccessPlatform:
             raise
 
     def regenerate_collection(self, collection_id):
-        paginator = s3_client.get_paginator("list_objects_v2")
         archival_object_prefixes = []
-        for result in paginator.paginate(
-            Bucket=config("ALCHEMIST_BUCKET"),
-            Delimiter="/",
-            Prefix=f'{config("ALCHEMIST_URL_PREFIX")}/{collection_id}/',
+        for prefix in list_common_prefixes(
+            f"{settings.get_settings().alchemist_url_prefix}/{collection_id}/"
         ):
-            for prefix in result.get("CommonPrefixes"):
-                # store collection_id/component_id/
-                archival_object_prefixes.append(prefix.get("Prefix"))
-                logger.debug(f'🐞 ARCHIVAL_OBJECT_PREFIX: {prefix.get("Prefix")}')
+            # store collection_id/component_id/
+            archival_object_prefixes.append(prefix)
+            logger.debug(f"🐞 ARCHIVAL_OBJECT_PREFIX: {prefix}")
         return archival_object_prefixes
 
     def regenerate_all(self):
-        paginator = s3_client.get_paginator("list_objects_v2")
-        collection_prefixes = []
-        for page in paginator.paginate(
-            Bucket=config("ALCHEMIST_BUCKET"), Delimiter="/"
-        ):
-            logger.debug(f'🐞 COMMON_PREFIXES: {page.get("CommonPrefixes")}')
-            for top_level_prefix in page.get("CommonPrefixes"):
-                if top_level_prefix.get("Prefix").strip("/") == config(
-                    "ALCHEMIST_URL_PREFIX"
-                ):
-                    for collection in paginator.paginate(
-                        Bucket=config("ALCHEMIST_BUCKET"),
-                        Delimiter="/",
-                        Prefix=f'{config("ALCHEMIST_URL_PREFIX")}/',
-                    ):
-                        for prefix in collection.get("CommonPrefixes"):
-                            # store collection_id/
-                            collection_prefixes.append(prefix.get("Prefix"))
-                            logger.debug(f'🐞 COLLECTION_PREFIX: {prefix.get("Prefix")}')
-        archival_object_prefixes = []
-        for collection_prefix in collection_prefixes:
-            for result in paginator.paginate(
-                Bucket=config("ALCHEMIST_BUCKET"),
-                Delimiter="/",
-                Prefix=collection_prefix,
-            ):
-                for prefix in result.get("CommonPrefixes"):
-                    # store collection_id/component_id/
-                    archival_object_prefixes.append(prefix.get("Prefix"))
-                    logger.debug(f'🐞 ARCHIVAL_OBJECT_PREFIX: {prefix.get("Prefix")}')
-        return archival_object_prefixes
+        """Yield archival object prefixes for every collection in the bucket.
+
+        Collection prefixes are listed concurrently and archival object prefixes
+        are yielded as each listing completes, so regeneration can begin before
+        the whole bucket has been enumerated.
+        """
+        # NOTE listing the prefix directly yields nothing when it does not exist
+        collection_prefixes = list_common_prefixes(
+            f"{settings.get_settings().alchemist_url_prefix}/"
+        )
+        logger.debug(f"🐞 COLLECTION_PREFIXES: {collection_prefixes}")
+        yield from iterate_archival_object_prefixes(collection_prefixes)
+
+
+def list_common_prefixes(prefix):
+    """Return the prefixes one level below the given prefix in the bucket."""
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    common_prefixes = []
+    for page in paginator.paginate(
+        Bucket=settings.get_settings().alchemist_bucket, Delimiter="/", Prefix=prefix
+    ):
+        for common_prefix in page.get("CommonPrefixes", []):
+            common_prefixes.append(common_prefix.get("Prefix"))
+    return common_prefixes
+
+
+def iterate_archival_object_prefixes(collection_prefixes):
+    """Concurrently list collection prefixes and yield unique archival object prefixes."""
+    seen = set()
+    with ThreadPoolExecutor(
+        max_workers=settings.get_settings().alchemist_list_workers
+    ) as executor:
+        futures = [
+            executor.submit(list_common_prefixes, collection_prefix)
+            # NOTE dict.fromkeys() removes duplicates while keeping the order
+            for collection_prefix in dict.fromkeys(collection_prefixes)
+        ]
+        for future in as_completed(futures):
+            for prefix in future.result():
+                if prefix in seen:
+                    continue
+                seen.add(prefix)
+                # yield collection_id/component_id/
+                logger.debug(f"🐞 ARCHIVAL_OBJECT_PREFIX: {prefix}")
+                yield prefix
 
 
 def invalidate_cloudfront_path(path="/*", caller_reference=None):
-    if not caller_reference:
-        caller_reference = str(time.time())
-    cloudfront_client = boto3.client(
+    """Invalidate one path and block until the invalidation completes."""
+    invalidation_id = create_cloudfront_invalidation([path], caller_reference)
+    wait_for_cloudfront_invalidation(invalidation_id)
+
+
+def request_cloudfront_invalidation(path, status_logger=None):
+    """Queue a path for invalidation and return a Future without blocking.
+
+    The Future resolves with the invalidation id once CloudFront reports that
+    an invalidation covering the path has completed; call result() only when
+    fresh content must be served before continuing.
+    """
+    return invalidation_queue.request(path, status_logger)
+
+
+@distillery.per_process
+def get_cloudfront_client():
+    return boto3.client(
         "cloudfront",
-        aws_access_key_id=config("DISTILLERY_AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=config("DISTILLERY_AWS_SECRET_ACCESS_KEY"),
-    )
-    # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/cloudfront/client/create_invalidation.html
-    response = cloudfront_client.create_invalidation(
-        DistributionId=config("ALCHEMIST_CLOUDFRONT_DISTRIBUTION_ID"),
-        InvalidationBatch={
-            "Paths": {"Quantity": 1, "Items": [path]},
-            "CallerReference": caller_reference,
-        },
+        aws_access_key_id=settings.get_settings().distillery_aws_access_key_id,
+        aws_secret_access_key=settings.get_settings().distillery_aws_secret_access_key,
     )
+
+
+def create_cloudfront_invalidation(paths, caller_reference=None, attempts=10):
+    """Create an invalidation and return its id.
+
+    NOTE CloudFront allows 15 wildcard paths in progress at one time across
+    the whole account, so other jobs and earlier batches can use them up;
+    the request is retried with backoff until they complete
+    """
+    if not caller_reference:
+        caller_reference = str(time.time())
+    for attempt in range(attempts):
+        try:
+            # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/cloudfront/client/create_invalidation.html
+            response = get_cloudfront_client().create_invalidation(
+                DistributionId=settings.get_settings().alchemist_cloudfront_distribution_id,
+                InvalidationBatch={
+                    "Paths": {"Quantity": len(paths), "Items": paths},
+                    "CallerReference": caller_reference,
+                },
+            )
+        except botocore.exceptions.ClientError as error:
+            if (
+                error.response["Error"]["Code"] != "TooManyInvalidationsInProgress"
+                or attempt == attempts - 1
+            ):
+                raise
+            delay = min(5 * 2**attempt, 120)
+            logger.warning(
+                f"⚠️  TOO MANY CLOUDFRONT INVALIDATIONS IN PROGRESS; RETRYING IN {delay}s"
+            )
+            time.sleep(delay)
+        else:
+            break
     logger.debug(f"🐞 CLOUDFRONT INVALIDATION RESPONSE: {str(response)}")
+    return response["Invalidation"]["Id"]
+
+
+def wait_for_cloudfront_invalidation(invalidation_id):
     # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/cloudfront/waiter/InvalidationCompleted.html
-    waiter = cloudfront_client.get_waiter("invalidation_completed")
-    logger.debug("🐞 WAITING ON CLOUDFRONT INVALIDATION")
+    waiter = get_cloudfront_client().get_waiter("invalidation_completed")
+    logger.debug(f"🐞 WAITING ON CLOUDFRONT INVALIDATION: {invalidation_id}")
     waiter.wait(
-        DistributionId=config("ALCHEMIST_CLOUDFRONT_DISTRIBUTION_ID"),
-        Id=response["Invalidation"]["Id"],
+        DistributionId=settings.get_settings().alchemist_cloudfront_distribution_id,
+        Id=invalidation_id,
     )
-    logger.debug("🐞 CLOUDFRONT INVALIDATION COMPLETE")
+    logger.debug(f"🐞 CLOUDFRONT INVALIDATION COMPLETE: {invalidation_id}")
+
+
+def coalesce_invalidation_paths(paths, max_paths=15):
+    """Return a minimal sorted list of paths covering all the given paths.
+
+    Paths covered by a wildcard path are dropped; while there are more than
+    max_paths the deepest paths are replaced with a wildcard for their parent.
+    NOTE max_paths only limits one invalidation; the CloudFront limit on
+    wildcard paths in progress is handled by create_cloudfront_invalidation
+    """
+    paths = set(paths)
+    while True:
+        wildcards = [path[:-1] for path in paths if path.endswith("*")]
+        paths = {
+            path
+            for path in paths
+            if not any(
+                path != wildcard + "*" and path.startswith(wildcard)
+                for wildcard in wildcards
+            )
+        }
+        if len(paths) <= max_paths:
+            return sorted(paths)
+        depth = max(path.rstrip("*").rstrip("/").count("/") for path in paths)
+        paths = {
+            path.rstrip("*").rstrip("/").rsplit("/", 1)[0] + "/*"
+            if path.rstrip("*").rstrip("/").count("/") == depth
+            else path
+            for path in paths
+        }
+
+
+class InvalidationQueue:
+    """Collect paths from many operations into coalesced CloudFront invalidations.
+
+    Requested paths are gathered for ALCHEMIST_INVALIDATION_DELAY seconds and
+    submitted as one batch by a background thread; waiting on completion
+    happens in other threads so new batches are never held up.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def request(self, path, status_logger=None):
+        future = Future()
+        with self.condition:
+            self.pending.setdefault(path, []).append((future, status_logger))
+            if not self.thread:
+                self.thread = threading.Thread(target=self.submit_batches, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return future
+
+    def submit_batches(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+            # allow other operations to add paths to this batch
+            time.sleep(settings.get_settings().alchemist_invalidation_delay)
+            with self.condition:
+                pending, self.pending = self.pending, {}
+            requests = [
+                request for requests in pending.values() for request in requests
+            ]
+            status_loggers = {
+                status_logger for future, status_logger in requests if status_logger
+            }
+            paths = coalesce_invalidation_paths(
+                pending,
+                settings.get_settings().alchemist_invalidation_max_paths,
+            )
+            try:
+                invalidation_id = create_cloudfront_invalidation(paths)
+            except Exception as e:
+                logger.exception("‼️")
+                for future, status_logger in requests:
+                    future.set_exception(e)
+                continue
+            for status_logger in status_loggers:
+                status_logger.info(
+                    f'☁️  CLOUDFRONT INVALIDATION SUBMITTED: {invalidation_id} ({", ".join(paths)})'
+                )
+            self.executor.submit(
+                self.wait_for_batch, invalidation_id, requests, status_loggers
+            )
+
+    def wait_for_batch(self, invalidation_id, requests, status_loggers):
+        try:
+            wait_for_cloudfront_invalidation(invalidation_id)
+        except Exception as e:
+            logger.exception("‼️")
+            for status_logger in status_loggers:
+                status_logger.error(
+                    f"❌ CLOUDFRONT INVALIDATION FAILED: {invalidation_id}"
+                )
+            for future, status_logger in requests:
+                future.set_exception(e)
+            return
+        for status_logger in status_loggers:
+            status_logger.info(
+                f"☁️  CLOUDFRONT INVALIDATION COMPLETE: {invalidation_id}"
+            )
+        for future, status_logger in requests:
+            future.set_result(invalidation_id)
+
+
+invalidation_queue = InvalidationQueue()
 
 
 def validate_connection():
     try:
-        response = s3_client.put_object(
-            Bucket=config("ALCHEMIST_BUCKET"), Key=".distillery"
+        response = get_s3_client().put_object(
+            Bucket=settings.get_settings().alchemist_bucket, Key=".distillery"
         )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            logger.info(f'☁️  S3 BUCKET WRITABLE: {config("ALCHEMIST_BUCKET")}')
+            logger.info(
+                f"☁️  S3 BUCKET WRITABLE: {settings.get_settings().alchemist_bucket}"
+            )
             return True
         else:
-            logger.error(f'❌ S3 BUCKET NOT WRITABLE: {config("ALCHEMIST_BUCKET")}')
+            logger.error(
+                f"❌ S3 BUCKET NOT WRITABLE: {settings.get_settings().alchemist_bucket}"
+            )
             logger.error(f"❌ S3 BUCKET RESPONSE: {response}")
             return False
     except botocore.exceptions.ClientError as error:
@@ -454,8 +642,8 @@ def generate_archival_object_page(build_directory, variables):
             template = environment.get_template("alchemist/archival_object.tpl")
             iiif_manifest_url = "/".join(
                 [
-                    config("ALCHEMIST_BASE_URL").rstrip("/"),
-                    config("ALCHEMIST_URL_PREFIX"),
+                    settings.get_settings().alchemist_base_url,
+                    settings.get_settings().alchemist_url_prefix,
                     variables["arrangement"]["collection_id"],
                     variables["archival_object"]["component_id"],
                     "manifest.json",
@@ -491,7 +679,7 @@ def generate_archival_object_page(build_directory, variables):
             variables["archival_object"]
         )
         archival_object_page_key = (
-            Path(config("ALCHEMIST_URL_PREFIX"))
+            Path(settings.get_settings().alchemist_url_prefix)
             .joinpath(
                 variables["arrangement"]["collection_id"],
                 variables["archival_object"]["component_id"],
@@ -522,7 +710,7 @@ def generate_archival_object_page(build_directory, variables):
                     extents=extents_display,
                     subjects=subjects,
                     notes=notes_display,
-                    archivesspace_public_url=config("ASPACE_PUBLIC_URL"),
+                    archivesspace_public_url=settings.get_settings().aspace_public_url,
                     archival_object_uri=variables["archival_object"]["uri"],
                     iiif_manifest_url=iiif_manifest_url,
                     iiif_manifest_json=json.dumps({"manifest": f"{iiif_manifest_url}"}),
@@ -545,7 +733,7 @@ def upload_archival_object_page(build_directory, variables):
         )
         logger.info(f"🐛 BUILD DIRECTORY: {build_directory.name}")
         archival_object_page_key = (
-            Path(config("ALCHEMIST_URL_PREFIX"))
+            Path(settings.get_settings().alchemist_url_prefix)
             .joinpath(
                 variables["arrangement"]["collection_id"],
                 variables["archival_object"]["component_id"],
@@ -559,11 +747,10 @@ def upload_archival_object_page(build_directory, variables):
         logger.info(
             f"🐛 ARCHIVAL OBJECT PAGE FILE EXISTS: {Path(archival_object_page_file).exists()}"
         )
-        # TODO add config("ALCHEMIST_BUCKET") to variables for fewer calls to decouple
         try:
-            response = s3_client.upload_file(
+            response = get_s3_client().upload_file(
                 archival_object_page_file,
-                config("ALCHEMIST_BUCKET"),
+                settings.get_settings().alchemist_bucket,
                 archival_object_page_key,
                 ExtraArgs={"ContentType": "text/html"},
             )
@@ -580,8 +767,8 @@ def get_thumbnail_url(variables):
     if source_file.suffix == ".mp4":
         return "/".join(
             [
-                config("ALCHEMIST_BASE_URL").rstrip("/"),
-                config("ALCHEMIST_URL_PREFIX"),
+                settings.get_settings().alchemist_base_url,
+                settings.get_settings().alchemist_url_prefix,
                 variables["arrangement"]["collection_id"],
                 variables["archival_object"]["component_id"],
                 "thumbnail.webp",
@@ -589,7 +776,7 @@ def get_thumbnail_url(variables):
         )
     thumbnail_id = "/".join(
         [
-            config("ALCHEMIST_URL_PREFIX"),
+            settings.get_settings().alchemist_url_prefix,
             variables["arrangement"]["collection_id"],
             variables["archival_object"][
                 "component_id"
@@ -599,7 +786,7 @@ def get_thumbnail_url(variables):
     )
     return "/".join(
         [
-            config("ALCHEMIST_IIIF_ENDPOINT").rstrip("/"),
+            settings.get_settings().alchemist_iiif_endpoint,
             thumbnail_id,
             "full",
             "200,",
@@ -695,7 +882,7 @@ def generate_iiif_manifest(build_directory, variables):
     try:
         if variables.get("alchemist_regenerate"):
             manifest_key = (
-                Path(config("ALCHEMIST_URL_PREFIX"))
+                Path(settings.get_settings().alchemist_url_prefix)
                 .joinpath(
                     variables["arrangement"]["collection_id"],
                     variables["archival_object"]["component_id"],
@@ -703,8 +890,8 @@ def generate_iiif_manifest(build_directory, variables):
                 )
                 .as_posix()
             )
-            response = s3_client.get_object(
-                Bucket=config("ALCHEMIST_BUCKET"), Key=manifest_key
+            response = get_s3_client().get_object(
+                Bucket=settings.get_settings().alchemist_bucket, Key=manifest_key
             )
             manifest = json.loads(response["Body"].read())
         else:
@@ -713,8 +900,8 @@ def generate_iiif_manifest(build_directory, variables):
                 "@type": "sc:Manifest",
                 "@id": "/".join(
                     [
-                        config("ALCHEMIST_BASE_URL").rstrip("/"),
-                        config("ALCHEMIST_URL_PREFIX"),
+                        settings.get_settings().alchemist_base_url,
+                        settings.get_settings().alchemist_url_prefix,
                         variables["arrangement"]["collection_id"],
                         variables["archival_object"]["component_id"],
                         "manifest.json",
@@ -757,7 +944,7 @@ def generate_iiif_manifest(build_directory, variables):
                     manifest["sequences"][0]["canvases"].append(future.result())
         # save manifest file
         manifest_file = Path(build_directory.name).joinpath(
-            config("ALCHEMIST_URL_PREFIX"),
+            settings.get_settings().alchemist_url_prefix,
             variables["arrangement"]["collection_id"],
             variables["archival_object"]["component_id"],
             "manifest.json",
@@ -773,15 +960,17 @@ def generate_iiif_manifest(build_directory, variables):
 
 def create_canvas_metadata(filepath, variables):
     dimensions = (
-        os.popen(f'{config("WORK_MAGICK_CMD")} identify -format "%w*%h" {filepath}')
+        os.popen(
+            f'{settings.get_settings().work_magick_cmd} identify -format "%w*%h" {filepath}'
+        )
         .read()
         .strip()
         .split("*")
     )
     canvas_id = "/".join(
         [
-            config("ALCHEMIST_BASE_URL").rstrip("/"),
-            config("ALCHEMIST_URL_PREFIX"),
+            settings.get_settings().alchemist_base_url,
+            settings.get_settings().alchemist_url_prefix,
             variables["arrangement"]["collection_id"],
             variables["archival_object"]["component_id"],
             "canvas",
@@ -790,14 +979,14 @@ def create_canvas_metadata(filepath, variables):
     )
     escaped_identifier = "/".join(
         [
-            config("ALCHEMIST_URL_PREFIX"),
+            settings.get_settings().alchemist_url_prefix,
             variables["arrangement"]["collection_id"],
             variables["archival_object"]["component_id"],
             f"{Path(filepath).stem}",
         ]
     )
     service_id = "/".join(
-        [config("ALCHEMIST_IIIF_ENDPOINT").rstrip("/"), escaped_identifier]
+        [settings.get_settings().alchemist_iiif_endpoint, escaped_identifier]
     )
     resource_id = service_id + "/full/max/0/default.jpg"
     canvas = {
@@ -836,7 +1025,7 @@ def upload_iiif_manifest(build_directory, variables):
         )
         logger.info(f"🐛 BUILD DIRECTORY: {build_directory.name}")
         manifest_key = (
-            Path(config("ALCHEMIST_URL_PREFIX"))
+            Path(settings.get_settings().alchemist_url_prefix)
             .joinpath(
                 variables["arrangement"]["collection_id"],
                 variables["archival_object"]["component_id"],
@@ -846,11 +1035,10 @@ def upload_iiif_manifest(build_directory, variables):
         )
         manifest_file = Path(build_directory.name).joinpath(manifest_key).as_posix()
         logger.info(f"🐛 IIIF MANIFEST EXISTS: {Path(manifest_file).exists()}")
-        # TODO add config("ALCHEMIST_BUCKET") to variables for fewer calls to decouple
         try:
-            response = s3_client.upload_file(
+            response = get_s3_client().upload_file(
                 manifest_file,
-                config("ALCHEMIST_BUCKET"),
+                settings.get_settings().alchemist_bucket,
                 manifest_key,
                 ExtraArgs={"ContentType": "application/json"},
             )
@@ -886,7 +1074,7 @@ def conditional_derivative_file_processing(filepath, build_directory, variables)
     elif type.startswith("video/"):
         video_key = "/".join(
             [
-                config("ALCHEMIST_URL_PREFIX"),
+                settings.get_settings().alchemist_url_prefix,
                 variables["arrangement"]["collection_id"],
                 variables["archival_object"]["component_id"],
                 Path(variables["original_file_path"]).name,
@@ -899,7 +1087,7 @@ def conditional_derivative_file_processing(filepath, build_directory, variables)
             # create a thumbnail from the midpoint of the video
             duration = subprocess.run(
                 [
-                    config("WORK_FFPROBE_CMD"),
+                    settings.get_settings().work_ffprobe_cmd,
                     "-v",
                     "error",
                     "-show_entries",
@@ -915,7 +1103,7 @@ def conditional_derivative_file_processing(filepath, build_directory, variables)
             midpoint = str(float(duration) / 2)
             subprocess.run(
                 [
-                    config("WORK_FFMPEG_CMD"),
+                    settings.get_settings().work_ffmpeg_cmd,
                     "-y",
                     "-v",
                     "error",
@@ -951,7 +1139,8 @@ def create_pyramid_tiff(build_directory, variables):
         if (
             os.popen(
                 '{} identify -format "%m" {}'.format(
-                    config("WORK_MAGICK_CMD"), variables["original_file_path"]
+                    settings.get_settings().work_magick_cmd,
+                    variables["original_file_path"],
                 )
             )
             .read()
@@ -965,7 +1154,7 @@ def create_pyramid_tiff(build_directory, variables):
             )
             magick_output = subprocess.run(
                 [
-                    config("WORK_MAGICK_CMD"),
+                    settings.get_settings().work_magick_cmd,
                     "convert",
                     "-quiet",
                     variables["original_file_path"],
@@ -981,7 +1170,7 @@ def create_pyramid_tiff(build_directory, variables):
             vips_source_image = variables["original_file_path"]
         pyramid_tiff_key = "/".join(
             [
-                config("ALCHEMIST_URL_PREFIX"),
+                settings.get_settings().alchemist_url_prefix,
                 variables["arrangement"]["collection_id"],
                 variables["archival_object"]["component_id"],
                 f'{Path(variables["original_file_path"]).stem}.ptif',
@@ -992,7 +1181,7 @@ def create_pyramid_tiff(build_directory, variables):
         )
         vips_output = subprocess.run(
             [
-                config("WORK_VIPS_CMD"),
+                settings.get_settings().work_vips_cmd,
                 "tiffsave",
                 vips_source_image,
                 pyramid_tiff_file,
@@ -1018,60 +1207,109 @@ def create_pyramid_tiff(build_directory, variables):
 
 
 def publish_archival_object_access_files(build_directory, variables):
+    """Sync the build output of one archival object to the bucket.
+
+    Files are uploaded by a pool of threads through the shared publish client
+    so many archival objects can publish at once over pooled connections.
+    Like `s5cmd sync`, a file is skipped when the remote object has the same
+    size and is not older; remote objects with no local file are deleted
+    unless regenerating.
+    """
     # NOTE working on variables["archival_object"]["component_id"]
 
     archival_object_access_path = "/".join(
         [
-            config("ALCHEMIST_URL_PREFIX"),
+            settings.get_settings().alchemist_url_prefix,
             variables["arrangement"]["collection_id"],
             variables["archival_object"]["component_id"],
         ]
     )
 
-    def sync_output(line):
-        logger.debug(f"🐞 S5CMD SYNC OUTPUT: {line}")
-
-    # TODO think about how to DRY this out;
-    # we need one version with a --delete flag and one without
-    if variables.get("alchemist_regenerate"):
-        try:
-            s5cmd_cmd = sh.Command(config("WORK_S5CMD_CMD"))
-            sync = s5cmd_cmd(
-                "sync",
-                f"{build_directory.name}/{archival_object_access_path}/*",
-                f's3://{config("ALCHEMIST_BUCKET")}/{archival_object_access_path}/',
-                _env={
-                    "AWS_ACCESS_KEY_ID": config("DISTILLERY_AWS_ACCESS_KEY_ID"),
-                    "AWS_SECRET_ACCESS_KEY": config("DISTILLERY_AWS_SECRET_ACCESS_KEY"),
-                },
-                _out=sync_output,
-                _err=sync_output,
-                _bg=True,
+    # NOTE the threads are shut down before returning, so none are running
+    # when a later step forks a ProcessPoolExecutor
+    publish_executor = ThreadPoolExecutor(
+        max_workers=settings.get_settings().alchemist_publish_workers
+    )
+    try:
+        archival_object_build_directory = Path(build_directory.name).joinpath(
+            archival_object_access_path
+        )
+        local_files = {
+            filepath.relative_to(archival_object_build_directory).as_posix(): filepath
+            for filepath in archival_object_build_directory.rglob("*")
+            if filepath.is_file()
+        }
+        if not local_files:
+            # NOTE never sync an empty directory; it would delete everything
+            raise FileNotFoundError(
+                f"no files to publish in {archival_object_build_directory}"
             )
-            sync.wait()
-        except:
-            logger.exception("‼️")
-            raise
-    else:
-        try:
-            s5cmd_cmd = sh.Command(config("WORK_S5CMD_CMD"))
-            sync = s5cmd_cmd(
-                "sync",
-                "--delete",
-                f"{build_directory.name}/{archival_object_access_path}/*",
-                f's3://{config("ALCHEMIST_BUCKET")}/{archival_object_access_path}/',
-                _env={
-                    "AWS_ACCESS_KEY_ID": config("DISTILLERY_AWS_ACCESS_KEY_ID"),
-                    "AWS_SECRET_ACCESS_KEY": config("DISTILLERY_AWS_SECRET_ACCESS_KEY"),
-                },
-                _out=sync_output,
-                _err=sync_output,
-                _bg=True,
+        remote_objects = {}
+        paginator = get_publish_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(
+            Bucket=settings.get_settings().alchemist_bucket,
+            Prefix=f"{archival_object_access_path}/",
+        ):
+            for remote_object in page.get("Contents", []):
+                remote_objects[
+                    remote_object["Key"][len(archival_object_access_path) + 1 :]
+                ] = remote_object
+        uploads = []
+        for name, filepath in local_files.items():
+            remote_object = remote_objects.get(name)
+            if (
+                remote_object
+                and remote_object["Size"] == filepath.stat().st_size
+                and remote_object["LastModified"].timestamp()
+                >= filepath.stat().st_mtime
+            ):
+                logger.debug(f"🐞 UNCHANGED: {archival_object_access_path}/{name}")
+                continue
+            uploads.append(
+                publish_executor.submit(
+                    upload_access_file,
+                    filepath,
+                    f"{archival_object_access_path}/{name}",
+                )
             )
-            sync.wait()
-        except:
-            logger.exception("‼️")
-            raise
+        if not variables.get("alchemist_regenerate"):
+            # equivalent of `s5cmd sync --delete`
+            keys = [
+                f"{archival_object_access_path}/{name}"
+                for name in remote_objects
+                if name not in local_files
+            ]
+            # NOTE delete_objects accepts up to 1000 keys per request
+            for i in range(0, len(keys), 1000):
+                response = get_publish_client().delete_objects(
+                    Bucket=settings.get_settings().alchemist_bucket,
+                    Delete={
+                        "Objects": [{"Key": key} for key in keys[i : i + 1000]],
+                        "Quiet": True,
+                    },
+                )
+                if response.get("Errors"):
+                    raise RuntimeError(f'unable to delete: {response["Errors"]}')
+                logger.debug(f"🐞 DELETED: {keys[i : i + 1000]}")
+        for upload in uploads:
+            upload.result()
+    except:
+        logger.exception("‼️")
+        raise
+    finally:
+        publish_executor.shutdown(cancel_futures=True)
+
+
+def upload_access_file(filepath, key):
+    content_type, encoding = mimetypes.guess_type(filepath)
+    get_publish_client().upload_file(
+        str(filepath),
+        settings.get_settings().alchemist_bucket,
+        key,
+        ExtraArgs={"ContentType": content_type or "application/octet-stream"},
+        Config=boto3.s3.transfer.TransferConfig(use_threads=False),
+    )
+    logger.debug(f"🐞 UPLOADED: {key}")
 
 
 def create_digital_object_file_versions(build_directory, variables):
@@ -1082,7 +1320,7 @@ def create_digital_object_file_versions(build_directory, variables):
     archival_object_directory = (
         Path(build_directory.name)
         .joinpath(
-            config("ALCHEMIST_URL_PREFIX"),
+            settings.get_settings().alchemist_url_prefix,
             variables["arrangement"]["collection_id"],
             variables["archival_object"]["component_id"],
         )
@@ -1092,8 +1330,8 @@ def create_digital_object_file_versions(build_directory, variables):
 
     archival_object_page_url = "/".join(
         [
-            config("ALCHEMIST_BASE_URL").rstrip("/"),
-            config("ALCHEMIST_URL_PREFIX"),
+            settings.get_settings().alchemist_base_url,
+            settings.get_settings().alchemist_url_prefix,
             variables["arrangement"]["collection_id"],
             variables["archival_object"]["component_id"],
         ]
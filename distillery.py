@@ -3,6 +3,9 @@
 
 # processing functionality; see web.py for bottlepy web application
 
+import concurrent.futures
+import datetime
+import functools
 import hashlib
 import http
 import importlib
@@ -15,6 +18,10 @@ import os
 import random
 import shutil
 import string
+import subprocess
+import tempfile
+import threading
+import time
 
 from pathlib import Path
 
@@ -26,38 +33,67 @@ import urllib3
 from asnake.client import ASnakeClient
 from decouple import config
 
+import jobqueue
+import settings
 import statuslogger
 
-logging.config.fileConfig(
-    # set the logging configuration in the settings.ini file
-    os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.ini"),
-    disable_existing_loggers=False,  # log messages from sh will come through
-)
 logger = logging.getLogger("distillery")
 archivesspace_logger = logging.getLogger("archivesspace")
-status_logger = logging.getLogger("status")
-status_logger.setLevel(logging.INFO)
-status_logfile = Path(config("WORK_LOG_FILES")).joinpath("status.log")
-status_logfile.touch()
-status_handler = logging.FileHandler(status_logfile)
-status_handler.setLevel(logging.INFO)
-status_handler.setFormatter(statuslogger.StatusFormatter("%(message)s"))
-# HACK prevent duplicate handlers with circular imports
-if len(status_logger.handlers) == 0:
-    status_logger.addHandler(status_handler)
-
-# TODO do we need a class? https://stackoverflow.com/a/16502408/4100024
-# we have 8 functions that need an authorized connection to ArchivesSpace
-asnake_client = ASnakeClient(
-    baseurl=config("ASPACE_API_URL"),
-    username=config("ASPACE_USERNAME"),
-    password=config("ASPACE_PASSWORD"),
-)
-asnake_client.authorize()
+
+
+@functools.cache
+def configure_logging():
+    """Load the logging configuration once; forked processes inherit it."""
+    logging.config.fileConfig(
+        # set the logging configuration in the settings.ini file
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.ini"),
+        disable_existing_loggers=False,  # log messages from sh will come through
+    )
+
+
+def per_process(function):
+    """Create the return value of function on first use in each process.
+
+    NOTE clients hold open connections, which must not be shared with
+    processes forked by a ProcessPoolExecutor
+    """
+    values = {}
+    lock = threading.Lock()
+
+    @functools.wraps(function)
+    def wrapper():
+        if os.getpid() not in values:
+            with lock:
+                if os.getpid() not in values:
+                    values[os.getpid()] = function()
+        return values[os.getpid()]
+
+    return wrapper
+
+
+@per_process
+def get_asnake_client():
+    """Return a client authorized to connect to ArchivesSpace."""
+    asnake_client = ASnakeClient(
+        baseurl=settings.get_settings().aspace_api_url,
+        username=settings.get_settings().aspace_username,
+        password=settings.get_settings().aspace_password,
+    )
+    asnake_client.authorize()
+    return asnake_client
+
+
+# serialize updates to the alchemist regenerate index from concurrent jobs
+regenerate_index_lock = threading.Lock()
 
 
 @rpyc.service
 class DistilleryService(rpyc.Service):
+    # set by the job queue so a running job can be cancelled
+    cancel_event = None
+    # NOTE each job writes to its own status logger; see statuslogger.py
+    status_logger = None
+
     def _initiate_variables(self, destinations):
         # TODO change all references from self.destinations to self.variables["destinations"]
         self.destinations = destinations
@@ -70,58 +106,98 @@ class DistilleryService(rpyc.Service):
     def _import_modules(self):
         # NOTE self.destinations is a JSON string
         logger.debug(f"🐞 self.destinations: {self.destinations}")
-        if "onsite" in self.destinations and config("ONSITE_MEDIUM"):
+        if "onsite" in self.destinations and settings.get_settings().onsite_medium:
             # import ONSITE_MEDIUM module
             try:
-                self.onsite_medium = importlib.import_module(config("ONSITE_MEDIUM"))
+                self.onsite_medium = importlib.import_module(
+                    settings.get_settings().onsite_medium
+                )
                 logger.debug(f"🐞 self.onsite_medium: {self.onsite_medium}")
             except Exception:
-                message = f'❌ UNABLE TO IMPORT MODULE: {config("ONSITE_MEDIUM")}'
-                status_logger.error(message)
+                message = f"❌ UNABLE TO IMPORT MODULE: {settings.get_settings().onsite_medium}"
+                self.status_logger.error(message)
                 raise
-        if "cloud" in self.destinations and config("CLOUD_PLATFORM"):
+        if "cloud" in self.destinations and settings.get_settings().cloud_platform:
             # import CLOUD_PLATFORM module
             try:
-                self.cloud_platform = importlib.import_module(config("CLOUD_PLATFORM"))
+                self.cloud_platform = importlib.import_module(
+                    settings.get_settings().cloud_platform
+                )
                 logger.debug(f"🐞 self.cloud_platform: {self.cloud_platform}")
             except Exception:
-                message = f'❌ UNABLE TO IMPORT MODULE: {config("CLOUD_PLATFORM")}'
-                status_logger.error(message)
+                message = f"❌ UNABLE TO IMPORT MODULE: {settings.get_settings().cloud_platform}"
+                self.status_logger.error(message)
                 raise
-        if "access" in self.destinations and config("ACCESS_PLATFORM"):
+        if "access" in self.destinations and settings.get_settings().access_platform:
             # import ACCESS_PLATFORM module
             try:
                 self.access_platform = importlib.import_module(
-                    config("ACCESS_PLATFORM")
+                    settings.get_settings().access_platform
                 )
                 logger.debug(f"🐞 self.access_platform: {self.access_platform}")
                 logger.debug(
                     f"🐞 bool(self.access_platform): {bool(self.access_platform)}"
                 )
             except Exception:
-                message = f'❌ UNABLE TO IMPORT MODULE: {config("ACCESS_PLATFORM")}'
-                status_logger.error(message)
+                message = f"❌ UNABLE TO IMPORT MODULE: {settings.get_settings().access_platform}"
+                self.status_logger.error(message)
                 raise
 
+    @rpyc.exposed
+    def enqueue(self, job_type, kwargs, priority=0):
+        """Queue a validate, run or alchemist_regenerate job and return its id.
+
+        NOTE kwargs is a JSON string of the keyword arguments for the method
+        """
+        kwargs = json.loads(kwargs)
+        if job_type == "run" and kwargs.get("resume"):
+            for job in job_queue.jobs():
+                if (
+                    job["type"] == "run"
+                    and job["state"] in ["queued", "running"]
+                    and json.loads(job["kwargs"])["batch_set_id"]
+                    == kwargs["batch_set_id"]
+                ):
+                    # NOTE the batch is already being run
+                    return job["id"]
+            # a resumed run starts new logs with the same names
+            statuslogger.archive_status_log(
+                Path(settings.get_settings().work_log_files).joinpath(
+                    f'{kwargs["batch_set_id"]}.run.log'
+                )
+            )
+        return job_queue.enqueue(job_type, kwargs, priority)
+
+    @rpyc.exposed
+    def jobs(self):
+        """Return a JSON string of the most recent jobs."""
+        return json.dumps(job_queue.jobs())
+
+    @rpyc.exposed
+    def job(self, job_id):
+        """Return a JSON string of one job."""
+        return json.dumps(job_queue.job(job_id))
+
+    @rpyc.exposed
+    def cancel(self, job_id):
+        """Cancel a queued job or stop a running one; return the job state."""
+        return job_queue.cancel(job_id)
+
     @rpyc.exposed
     def validate(self, destinations, batch_set_id):
         """Validate connections, files, and data."""
-
-        # reset status_logfile
-        status_logger = logging.getLogger("status")
-        for status_logger_handler in status_logger.handlers[:]:
-            # remove the existing file handlers
-            if isinstance(status_logger_handler, logging.FileHandler):
-                status_logger.removeHandler(status_logger_handler)
-        # set the new handler
-        status_logfile = Path(config("WORK_LOG_FILES")).joinpath(
-            f"{batch_set_id}.validate.log"
+        self.status_logger = statuslogger.create_status_logger(
+            Path(settings.get_settings().work_log_files).joinpath(
+                f"{batch_set_id}.validate.log"
+            )
         )
-        status_logfile.touch()
-        status_handler = logging.FileHandler(status_logfile)
-        status_handler.setLevel(logging.INFO)
-        status_handler.setFormatter(statuslogger.StatusFormatter("%(message)s"))
-        status_logger.addHandler(status_handler)
+        try:
+            self._validate(destinations, batch_set_id)
+        finally:
+            statuslogger.close_status_logger(self.status_logger)
+
+    def _validate(self, destinations, batch_set_id):
+        status_logger = self.status_logger
 
         self._initiate_variables(destinations)
 
@@ -132,45 +208,61 @@ class DistilleryService(rpyc.Service):
         if self.onsite_medium:
             # validate ONSITE_MEDIUM connection
             if self.onsite_medium.validate_connection():
-                message = f'☑️  CONNECTION SUCCESS: {config("ONSITE_MEDIUM")}'
+                message = (
+                    f"☑️  CONNECTION SUCCESS: {settings.get_settings().onsite_medium}"
+                )
                 status_logger.info(message)
             else:
-                message = f'❌ CONNECTION FAILURE: {config("ONSITE_MEDIUM")}'
+                message = (
+                    f"❌ CONNECTION FAILURE: {settings.get_settings().onsite_medium}"
+                )
                 status_logger.error(message)
                 raise ConnectionError(message)
-            if not config("TAPE_CONTAINER_PROFILE_URI", default=""):
+            if not settings.get_settings().tape_container_profile_uri:
                 message = "❌ MISSING TAPE_CONTAINER_PROFILE_URI SETTING"
                 status_logger.error(message)
                 raise ValueError(message)
-            elif not archivessnake_get(config("TAPE_CONTAINER_PROFILE_URI")).ok:
-                message = f'❌ INVALID TAPE_CONTAINER_PROFILE_URI SETTING: {config("TAPE_CONTAINER_PROFILE_URI")}'
+            elif not archivessnake_get(
+                settings.get_settings().tape_container_profile_uri
+            ).ok:
+                message = f"❌ INVALID TAPE_CONTAINER_PROFILE_URI SETTING: {settings.get_settings().tape_container_profile_uri}"
                 status_logger.error(message)
                 raise ValueError(message)
         if self.cloud_platform:
             # validate CLOUD_PLATFORM connection
             if self.cloud_platform.validate_connection():
-                message = f'☑️  CONNECTION SUCCESS: {config("CLOUD_PLATFORM")}'
+                message = (
+                    f"☑️  CONNECTION SUCCESS: {settings.get_settings().cloud_platform}"
+                )
                 status_logger.info(message)
             else:
-                message = f'❌ CONNECTION FAILURE: {config("CLOUD_PLATFORM")}'
+                message = (
+                    f"❌ CONNECTION FAILURE: {settings.get_settings().cloud_platform}"
+                )
                 status_logger.error(message)
                 raise ConnectionError(message)
         if self.access_platform:
             # validate ACCESS_PLATFORM connection
             if self.access_platform.validate_connection():
-                message = f'☑️  CONNECTION SUCCESS: {config("ACCESS_PLATFORM")}'
+                message = (
+                    f"☑️  CONNECTION SUCCESS: {settings.get_settings().access_platform}"
+                )
                 status_logger.info(message)
             else:
-                message = f'❌ CONNECTION FAILURE: {config("ACCESS_PLATFORM")}'
+                message = (
+                    f"❌ CONNECTION FAILURE: {settings.get_settings().access_platform}"
+                )
                 status_logger.error(message)
                 raise ConnectionError(message)
 
         # validate WORK_PRESERVATION_FILES directory
         if self.onsite_medium or self.cloud_platform:
             try:
-                Path(config("WORK_PRESERVATION_FILES")).resolve(strict=True)
+                Path(settings.get_settings().work_preservation_files).resolve(
+                    strict=True
+                )
             except:
-                message = f'❌ INVALID WORK_PRESERVATION_FILES DIRECTORY: {config("WORK_PRESERVATION_FILES")}'
+                message = f"❌ INVALID WORK_PRESERVATION_FILES DIRECTORY: {settings.get_settings().work_preservation_files}"
                 status_logger.error(message)
                 logger.exception("‼️")
                 raise
@@ -187,7 +279,7 @@ class DistilleryService(rpyc.Service):
             elif not archival_object["publish"]:
                 message = "‼️ ARCHIVAL OBJECT NOT PUBLISHED: [**{}**]({}/resolve/readonly?uri={})".format(
                     archival_object["title"],
-                    config("ASPACE_STAFF_URL"),
+                    settings.get_settings().aspace_staff_url,
                     archival_object["uri"],
                 )
                 status_logger.error(message)
@@ -195,7 +287,7 @@ class DistilleryService(rpyc.Service):
             elif archival_object["has_unpublished_ancestor"]:
                 message = "‼️ ARCHIVAL OBJECT HAS UNPUBLISHED ANCESTOR: [**{}**]({}/resolve/readonly?uri={})".format(
                     archival_object["title"],
-                    config("ASPACE_STAFF_URL"),
+                    settings.get_settings().aspace_staff_url,
                     archival_object["uri"],
                 )
                 status_logger.error(message)
@@ -209,7 +301,7 @@ class DistilleryService(rpyc.Service):
                 if digital_object_count > 1:
                     message = "‼️ MULTIPLE DIGITAL OBJECTS FOUND: [**{}**]({}/resolve/readonly?uri={})".format(
                         archival_object["title"],
-                        config("ASPACE_STAFF_URL"),
+                        settings.get_settings().aspace_staff_url,
                         archival_object["uri"],
                     )
                     status_logger.error(message)
@@ -222,7 +314,7 @@ class DistilleryService(rpyc.Service):
                     ):
                         message = "‼️  DIGITAL OBJECT ALREADY HAS FILE VERSIONS: [**{}**]({}/resolve/readonly?uri={})".format(
                             instance["digital_object"]["_resolved"]["title"],
-                            config("ASPACE_STAFF_URL"),
+                            settings.get_settings().aspace_staff_url,
                             instance["digital_object"]["ref"],
                         )
                         status_logger.error(message)
@@ -230,7 +322,7 @@ class DistilleryService(rpyc.Service):
                     elif instance["digital_object"]["_resolved"].get("file_versions"):
                         message = "⚠️ EXISTING WEB ACCESS FILES WILL BE REPLACED AND DIGITAL OBJECT RECORDS WILL BE UPDATED: [**{}**]({}/resolve/readonly?uri={})".format(
                             instance["digital_object"]["_resolved"]["title"],
-                            config("ASPACE_STAFF_URL"),
+                            settings.get_settings().aspace_staff_url,
                             instance["digital_object"]["ref"],
                         )
                         status_logger.warning(message)
@@ -249,7 +341,9 @@ class DistilleryService(rpyc.Service):
         file_count = 0
         unsupported_filetypes = 0
         validation_failures = 0
-        for dirpath, dirnames, filenames in os.walk(config("INITIAL_ORIGINAL_FILES")):
+        for dirpath, dirnames, filenames in os.walk(
+            settings.get_settings().initial_original_files
+        ):
             logger.debug(f"🐞 DIRPATH: {dirpath}")
             logger.debug(f"🐞 DIRNAMES: {dirnames}")
             logger.debug(f"🐞 FILENAMES: {filenames}")
@@ -259,6 +353,7 @@ class DistilleryService(rpyc.Service):
                 raise FileNotFoundError(message)
             # check filenames in root directory
             for filename in filenames:
+                check_cancelled(self.cancel_event, status_logger, batch_set_id)
                 if filename in [".DS_Store", "Thumbs.db"]:
                     os.remove(Path(dirpath).joinpath(filename))
                 else:
@@ -277,6 +372,7 @@ class DistilleryService(rpyc.Service):
                     archival_object_count += 1
             # check dirnames in root directory
             for dirname in dirnames:
+                check_cancelled(self.cancel_event, status_logger, batch_set_id)
                 status_logger.info(f"📁 {dirname}")
                 if not is_archival_object_valid(dirname):
                     validation_failures += 1
@@ -308,27 +404,29 @@ class DistilleryService(rpyc.Service):
             raise FileNotFoundError(message)
 
         # send the character that stops javascript reloading in the web ui
-        status_logger.info(f"🈺")  # Japanese “Open for Business” Button
+        # Japanese “Open for Business” Button
+        status_logger.info(f"🈺", extra={"event": "finished"})
 
     @rpyc.exposed
-    def run(self, destinations, batch_set_id):
-        """Run Distillery."""
-
-        # reset status_logfile
-        status_logger = logging.getLogger("status")
-        for status_logger_handler in status_logger.handlers[:]:
-            # remove the existing file handlers
-            if isinstance(status_logger_handler, logging.FileHandler):
-                status_logger.removeHandler(status_logger_handler)
-        # set the new handler
-        status_logfile = Path(config("WORK_LOG_FILES")).joinpath(
-            f"{batch_set_id}.run.log"
+    def run(self, destinations, batch_set_id, resume=False):
+        """Run Distillery.
+
+        With resume, continue an earlier run of the batch from its journal.
+        """
+        self.status_logger = statuslogger.create_status_logger(
+            Path(settings.get_settings().work_log_files).joinpath(
+                f"{batch_set_id}.run.log"
+            )
         )
-        status_logfile.touch()
-        status_handler = logging.FileHandler(status_logfile)
-        status_handler.setLevel(logging.INFO)
-        status_handler.setFormatter(statuslogger.StatusFormatter("%(message)s"))
-        status_logger.addHandler(status_handler)
+        try:
+            self._run(destinations, batch_set_id, resume)
+        finally:
+            statuslogger.close_status_logger(self.status_logger)
+
+    def _run(self, destinations, batch_set_id, resume=False):
+        status_logger = self.status_logger
+        # deletes stillage directories in the background, one at a time
+        stillage_reaper = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
         try:
             self._initiate_variables(destinations)
@@ -345,31 +443,51 @@ class DistilleryService(rpyc.Service):
             else:
                 either_preservation_destination = False
 
-            try:
-                batch_directory = Path(config("BATCH_SETS_DIRECTORY")).joinpath(
-                    batch_set_id
-                )
-                batch_directory.mkdir(parents=True, exist_ok=True)
-                Path(config("INITIAL_ORIGINAL_FILES")).rename(
-                    batch_directory.joinpath("STAGE_1_INITIAL")
-                )
-                batch_directory.joinpath("STAGE_2_WORKING").mkdir(
-                    parents=True, exist_ok=True
-                )
-                batch_directory.joinpath("STAGE_3_COMPLETE").mkdir(
-                    parents=True, exist_ok=True
+            batch_directory = Path(
+                settings.get_settings().batch_sets_directory
+            ).joinpath(batch_set_id)
+            if resume:
+                if not batch_directory.joinpath("STAGE_2_WORKING").is_dir():
+                    message = f"❌ NO EARLIER RUN TO RESUME: {batch_set_id}"
+                    status_logger.error(message)
+                    raise FileNotFoundError(message)
+                journal = load_batch_journal(batch_directory)
+                status_logger.info(
+                    f"⏯️  RESUMING BATCH: {batch_set_id}",
+                    extra={"event": "resumed", "archival_objects": len(journal)},
                 )
-                Path(config("INITIAL_ORIGINAL_FILES")).mkdir()
-            except BaseException:
-                message = "❌ UNABLE TO MOVE THE SOURCE FILES FOR PROCESSING"
-                status_logger.error(message)
-                logger.exception(f"‼️")
-                raise
+            else:
+                try:
+                    batch_directory.mkdir(parents=True, exist_ok=True)
+                    Path(settings.get_settings().initial_original_files).rename(
+                        batch_directory.joinpath("STAGE_1_INITIAL")
+                    )
+                    batch_directory.joinpath("STAGE_2_WORKING").mkdir(
+                        parents=True, exist_ok=True
+                    )
+                    batch_directory.joinpath("STAGE_3_COMPLETE").mkdir(
+                        parents=True, exist_ok=True
+                    )
+                    Path(settings.get_settings().initial_original_files).mkdir()
+                except BaseException:
+                    message = "❌ UNABLE TO MOVE THE SOURCE FILES FOR PROCESSING"
+                    status_logger.error(message)
+                    logger.exception(f"‼️")
+                    raise
+                # NOTE a new run starts a new journal
+                get_batch_journal_file(batch_directory).write_text("")
+                journal = {}
 
+            # NOTE items interrupted in STAGE_2_WORKING are finished first
             for dir_entry in sorted(
+                os.scandir(batch_directory.joinpath("STAGE_2_WORKING")),
+                key=lambda dir_entry: dir_entry.name,
+            ) + sorted(
                 os.scandir(batch_directory.joinpath("STAGE_1_INITIAL")),
                 key=lambda dir_entry: dir_entry.name,
             ):
+                # NOTE unprocessed items remain in STAGE_1_INITIAL
+                check_cancelled(self.cancel_event, status_logger, batch_set_id)
                 if dir_entry.name in [".DS_Store", "Thumbs.db"]:
                     os.remove(dir_entry.path)
                     continue
@@ -383,6 +501,7 @@ class DistilleryService(rpyc.Service):
                     )
                     continue
 
+                archival_object_started = time.time()
                 try:
                     self.variables["archival_object"] = find_archival_object(
                         dir_entry_stem
@@ -401,23 +520,23 @@ class DistilleryService(rpyc.Service):
                         self.variables["arrangement"]["collection_id"]
                     )
                     status_logger.info(
-                        f'☑️  ARCHIVESSPACE COLLECTION DATA RETRIEVED: [**{collection_data["title"]}**]({config("ASPACE_STAFF_URL")}/resolve/readonly?uri={collection_data["uri"]})'
+                        f'☑️  ARCHIVESSPACE COLLECTION DATA RETRIEVED: [**{collection_data["title"]}**]({settings.get_settings().aspace_staff_url}/resolve/readonly?uri={collection_data["uri"]})'
                     )
                     # save collection metadata
                     save_collection_datafile(
-                        collection_data, config("WORK_PRESERVATION_FILES")
+                        collection_data, settings.get_settings().work_preservation_files
                     )
                     # run collection-level preprocessing
                     if self.onsite_medium:
                         self.onsite_medium.collection_level_preprocessing(
                             self.variables["arrangement"]["collection_id"],
-                            config("WORK_PRESERVATION_FILES"),
+                            settings.get_settings().work_preservation_files,
                         )
                         onsiteDistiller = True
                     if self.cloud_platform:
                         self.cloud_platform.collection_level_preprocessing(
                             self.variables["arrangement"]["collection_id"],
-                            config("WORK_PRESERVATION_FILES"),
+                            settings.get_settings().work_preservation_files,
                         )
                         cloudDistiller = True
 
@@ -435,7 +554,8 @@ class DistilleryService(rpyc.Service):
                     batch_directory.joinpath("STAGE_2_WORKING", dir_entry.name)
                 )
                 try:
-                    shutil.move(initial_archival_object, working_archival_object)
+                    if initial_archival_object != working_archival_object:
+                        shutil.move(initial_archival_object, working_archival_object)
                 except BaseException:
                     message = "❌ UNABLE TO MOVE THE INITIAL FILES FOR WORKING"
                     status_logger.error(message)
@@ -452,25 +572,71 @@ class DistilleryService(rpyc.Service):
                         if f.is_file()
                     ]
 
-                if either_preservation_destination:
+                if either_preservation_destination and is_batch_step_done(
+                    journal, dir_entry_stem, "preservation_files_prepared"
+                ):
+                    # NOTE preservation file names have random parts, so the
+                    # files prepared before the interruption are used again
+                    archival_object_datafile_key = get_archival_object_datafile_key(
+                        get_archival_object_directory_prefix(
+                            self.variables["arrangement"],
+                            self.variables["archival_object"],
+                        ),
+                        self.variables["archival_object"],
+                    )
+                    logger.info(
+                        f"⏭️  PRESERVATION FILES ALREADY PREPARED: {dir_entry_stem}"
+                    )
+                elif either_preservation_destination:
+                    # NOTE clear files left by an interrupted preparation so
+                    # copies with other random names are not transferred too
+                    archival_object_preservation_directory = Path(
+                        settings.get_settings().work_preservation_files
+                    ).joinpath(
+                        get_archival_object_directory_prefix(
+                            self.variables["arrangement"],
+                            self.variables["archival_object"],
+                        )
+                    )
+                    if archival_object_preservation_directory.is_dir():
+                        shutil.rmtree(archival_object_preservation_directory)
+                        logger.info(
+                            f"🗑️  PARTIAL PRESERVATION FILES REMOVED: {dir_entry_stem}"
+                        )
                     archival_object_datafile_key = save_archival_object_datafile(
                         self.variables["arrangement"],
                         self.variables["archival_object"],
-                        config("WORK_PRESERVATION_FILES"),
+                        settings.get_settings().work_preservation_files,
                     )
                     status_logger.info(
-                        f"☑️  ARCHIVAL OBJECT DATA FILE CREATED: {archival_object_datafile_key}"
+                        f"☑️  ARCHIVAL OBJECT DATA FILE CREATED: {archival_object_datafile_key}",
+                        extra={
+                            "event": "datafile_created",
+                            "archival_object": dir_entry_stem,
+                            "stage": "preservation",
+                        },
+                    )
+                    prepare_preservation_files(self.variables, status_logger)
+                    record_batch_step(
+                        batch_directory,
+                        journal,
+                        dir_entry_stem,
+                        "preservation_files_prepared",
                     )
-                    prepare_preservation_files(self.variables)
 
-                if accessDistiller:
+                if accessDistiller and is_batch_step_done(
+                    journal, dir_entry_stem, "access_published"
+                ):
+                    status_logger.info(
+                        f"⏭️  ACCESS PAGE ALREADY PUBLISHED: {dir_entry_stem}"
+                    )
+                elif accessDistiller:
                     accessDistiller.archival_object_level_processing(self.variables)
                     build_directory = accessDistiller.get_build_directory()
                     self.access_platform.loop_over_archival_object_files(
                         build_directory, self.variables
                     )
 
-                if accessDistiller:
                     # NOTE working on variables["archival_object"]["component_id"]
                     accessDistiller.transfer_archival_object_derivative_files(
                         self.variables
@@ -478,19 +644,32 @@ class DistilleryService(rpyc.Service):
                     status_logger.info(
                         "☑️  ACCESS PAGE CREATED: [**{}**]({}/{}/{}/{})".format(
                             self.variables["archival_object"]["component_id"],
-                            config("ALCHEMIST_BASE_URL").rstrip("/"),
-                            config("ALCHEMIST_URL_PREFIX"),
+                            settings.get_settings().alchemist_base_url,
+                            settings.get_settings().alchemist_url_prefix,
                             self.variables["arrangement"]["collection_id"],
                             self.variables["archival_object"]["component_id"],
-                        )
+                        ),
+                        extra={
+                            "event": "published",
+                            "archival_object": dir_entry_stem,
+                            "stage": "access",
+                        },
                     )
 
                     # NOTE this is where we create_digital_object_file_versions()
                     accessDistiller.loop_over_derivative_structure(self.variables)
+                    update_regenerate_index(
+                        [get_regenerate_index_entry(self.variables)]
+                    )
+                    record_batch_step(
+                        batch_directory, journal, dir_entry_stem, "access_published"
+                    )
 
                 if either_preservation_destination:
                     # Confirm existing or create digital_object with component_id.
                     # NOTE digital_object needs to exist for digital_object_component records to be attached
+                    # NOTE on resume the archival_object found above already
+                    # has the instance of a digital_object created earlier
                     try:
                         digital_object_count = len(
                             [
@@ -517,7 +696,7 @@ class DistilleryService(rpyc.Service):
                         raise
 
                     self.variables["current_archival_object_datafile"] = (
-                        Path(config("WORK_PRESERVATION_FILES"))
+                        Path(settings.get_settings().work_preservation_files)
                         .joinpath(archival_object_datafile_key)
                         .resolve()
                     )
@@ -525,24 +704,61 @@ class DistilleryService(rpyc.Service):
                         f'🐞 ARCHIVAL OBJECT DATAFILE: {self.variables["current_archival_object_datafile"]}'
                     )
 
-                    if self.onsite_medium:
+                    if self.onsite_medium and is_batch_step_done(
+                        journal, dir_entry_stem, "onsite_transferred"
+                    ):
+                        self.variables.update(
+                            journal[dir_entry_stem][("onsite_transferred", "")]
+                        )
+                        logger.info(
+                            f"⏭️  ONSITE FILES ALREADY TRANSFERRED: {dir_entry_stem}"
+                        )
+                    elif self.onsite_medium:
                         # tape_top_container_uri added to self.variables
                         self.variables = self.onsite_medium.transfer_archival_object_derivative_files(
                             self.variables
                         )
+                        record_batch_step(
+                            batch_directory,
+                            journal,
+                            dir_entry_stem,
+                            "onsite_transferred",
+                            data={
+                                key: self.variables[key]
+                                for key in ["tape_top_container_uri", "tape_indicator"]
+                                if key in self.variables
+                            },
+                        )
+                    if self.onsite_medium and not is_batch_step_done(
+                        journal, dir_entry_stem, "onsite_datafile_processed"
+                    ):
                         # NOTE writes top_container records to ArchivesSpace
                         self.onsite_medium.process_archival_object_datafile(
                             self.variables
                         )
-                    if self.cloud_platform:
+                        record_batch_step(
+                            batch_directory,
+                            journal,
+                            dir_entry_stem,
+                            "onsite_datafile_processed",
+                        )
+                    if self.cloud_platform and not is_batch_step_done(
+                        journal, dir_entry_stem, "cloud_datafile_processed"
+                    ):
                         self.cloud_platform.process_archival_object_datafile(
                             self.variables
                         )
+                        record_batch_step(
+                            batch_directory,
+                            journal,
+                            dir_entry_stem,
+                            "cloud_datafile_processed",
+                        )
 
                     # see https://stackoverflow.com/a/54790514 for os.walk explainer
                     for dirpath, dirnames, filenames in sorted(
                         os.walk(
-                            Path(config("WORK_PRESERVATION_FILES"))
+                            Path(settings.get_settings().work_preservation_files)
                             .joinpath(
                                 get_archival_object_directory_prefix(
                                     self.variables["arrangement"],
@@ -562,6 +778,32 @@ class DistilleryService(rpyc.Service):
                             ).name.startswith(Path(filename).stem):
                                 # skip archival_object JSON metadata
                                 continue
+                            preservation_file_key = filepath.relative_to(
+                                Path(
+                                    settings.get_settings().work_preservation_files
+                                ).resolve()
+                            ).as_posix()
+                            if (
+                                not self.onsite_medium
+                                or is_batch_step_done(
+                                    journal,
+                                    dir_entry_stem,
+                                    "onsite_file_processed",
+                                    preservation_file_key,
+                                )
+                            ) and (
+                                not self.cloud_platform
+                                or is_batch_step_done(
+                                    journal,
+                                    dir_entry_stem,
+                                    "cloud_file_processed",
+                                    preservation_file_key,
+                                )
+                            ):
+                                logger.info(
+                                    f"⏭️  PRESERVATION FILE ALREADY PROCESSED: {filepath}"
+                                )
+                                continue
                             logger.info(
                                 f"▶️  GETTING PRESERVATION FILE INFO: {filepath}"
                             )
@@ -576,78 +818,72 @@ class DistilleryService(rpyc.Service):
                                 self.variables["preservation_file_info"][
                                     "md5"
                                 ] = hashlib.md5(fb.read())
-                            if self.onsite_medium:
+                            if self.onsite_medium and not is_batch_step_done(
+                                journal,
+                                dir_entry_stem,
+                                "onsite_file_processed",
+                                preservation_file_key,
+                            ):
                                 self.onsite_medium.process_digital_object_component_file(
                                     self.variables
                                 )
-                            if self.cloud_platform:
+                                record_batch_step(
+                                    batch_directory,
+                                    journal,
+                                    dir_entry_stem,
+                                    "onsite_file_processed",
+                                    preservation_file_key,
+                                )
+                            if self.cloud_platform and not is_batch_step_done(
+                                journal,
+                                dir_entry_stem,
+                                "cloud_file_processed",
+                                preservation_file_key,
+                            ):
                                 self.cloud_platform.process_digital_object_component_file(
                                     self.variables
                                 )
+                                record_batch_step(
+                                    batch_directory,
+                                    journal,
+                                    dir_entry_stem,
+                                    "cloud_file_processed",
+                                    preservation_file_key,
+                                )
 
                     # move preservation files on each iteration because the
                     # rsync transfer to tape copies the entire contents of the
                     # directory; move them into an intermediate directory for
                     # deletion because deleting across slow file systems can
                     # result in cruft still existing on the next iteration
-                    if not config("WORK_STILLAGE_FILES", default=""):
-                        # create a .STILLAGE directory
-                        stillage_default = Path(
-                            config("WORK_PRESERVATION_FILES")
-                        ).parent.joinpath(".STILLAGE")
-                        stillage_default.mkdir(exist_ok=True)
-                    logger.debug(
-                        "🐞 STILLAGE DIRECTORY: {}".format(
-                            Path(
-                                config("WORK_STILLAGE_FILES", default=stillage_default)
-                            ).as_posix()
-                        )
-                    )
-                    if (
-                        Path(config("WORK_STILLAGE_FILES", default=stillage_default))
-                        .resolve()
-                        .joinpath(self.variables["arrangement"]["collection_id"])
-                        .is_dir()
+                    if not is_batch_step_done(
+                        journal, dir_entry_stem, "preservation_files_removed"
                     ):
-                        for dir_entry in os.scandir(
-                            Path(config("WORK_PRESERVATION_FILES")).joinpath(
-                                self.variables["arrangement"]["collection_id"]
-                            )
-                        ):
-                            shutil.move(
-                                dir_entry.path,
-                                Path(
-                                    config(
-                                        "WORK_STILLAGE_FILES", default=stillage_default
-                                    )
-                                )
-                                .resolve()
-                                .joinpath(
-                                    self.variables["arrangement"]["collection_id"]
-                                )
-                                .as_posix(),
-                            )
-                    else:
+                        stillage = Path(settings.get_settings().work_stillage_files)
+                        stillage.mkdir(exist_ok=True)
+                        # NOTE each archival object gets a directory of its
+                        # own, so a deletion still running never sees the
+                        # files moved in after it
+                        stillage_directory = tempfile.mkdtemp(
+                            prefix=f"{dir_entry_stem}-", dir=stillage
+                        )
+                        logger.debug(f"🐞 STILLAGE DIRECTORY: {stillage_directory}")
                         shutil.move(
-                            Path(config("WORK_PRESERVATION_FILES"))
+                            Path(settings.get_settings().work_preservation_files)
                             .joinpath(self.variables["arrangement"]["collection_id"])
                             .as_posix(),
-                            Path(
-                                config("WORK_STILLAGE_FILES", default=stillage_default)
-                            )
-                            .resolve()
-                            .as_posix(),
+                            stillage_directory,
                         )
-                    os.system(
-                        "/bin/rm -rf {}".format(
-                            Path(
-                                config("WORK_STILLAGE_FILES", default=stillage_default)
-                            )
-                            .joinpath(self.variables["arrangement"]["collection_id"])
-                            .resolve()
-                            .as_posix()
+                        # deletion overlaps with the next archival object
+                        stillage_reaper.submit(
+                            remove_stillage_directory, stillage_directory, status_logger
+                        )
+                        record_batch_step(
+                            batch_directory,
+                            journal,
+                            dir_entry_stem,
+                            "preservation_files_removed",
                         )
-                    )
 
                 try:
                     shutil.move(
@@ -661,38 +897,55 @@ class DistilleryService(rpyc.Service):
                     status_logger.error(message)
                     logger.exception(f"‼️")
                     raise
-
+                record_batch_step(batch_directory, journal, dir_entry_stem, "completed")
+                status_logger.info(
+                    f"☑️  ARCHIVAL OBJECT COMPLETE: {dir_entry_stem}",
+                    extra={
+                        "event": "archival_object_completed",
+                        "archival_object": dir_entry_stem,
+                        "duration": time.time() - archival_object_started,
+                    },
+                )
+        except jobqueue.JobCancelled:
+            raise
         except Exception as e:
-            status_logger.error("❌ SOMETHING WENT WRONG")
+            status_logger.error(
+                "❌ SOMETHING WENT WRONG", extra={"event": "failed", "error": e}
+            )
             status_logger.error(e)
             logger.exception("‼️")
             raise
         # complete the process if there is no error
         else:
             # send the character that stops javascript reloading in the web ui
-            status_logger.info(f"🏁")
+            status_logger.info(f"🏁", extra={"event": "finished"})
             # TODO delete PRESERVATION_FILES/CollectionID directory
+        finally:
+            # NOTE failed deletions are still logged before run() closes the log
+            stillage_reaper.shutdown(wait=True)
 
     @rpyc.exposed
-    def alchemist_regenerate(self, component_id="", collection_id="", logfile=""):
-        if component_id:
-            status_logger = logging.getLogger(component_id)
-        elif collection_id:
-            status_logger = logging.getLogger(collection_id)
-        else:
-            status_logger = logging.getLogger("_")
-        status_logger.setLevel(logging.INFO)
-        Path(logfile).touch()
-        status_handler = logging.FileHandler(logfile)
-        status_handler.setLevel(logging.INFO)
-        status_handler.setFormatter(statuslogger.StatusFormatter("%(message)s"))
-        status_logger.addHandler(status_handler)
+    def alchemist_regenerate(
+        self, component_id="", collection_id="", logfile="", incremental=False
+    ):
+        self.status_logger = statuslogger.create_status_logger(logfile)
+        try:
+            self._alchemist_regenerate(component_id, collection_id, incremental)
+        finally:
+            statuslogger.close_status_logger(self.status_logger)
+
+    def _alchemist_regenerate(self, component_id, collection_id, incremental):
+        status_logger = self.status_logger
 
         # import ACCESS_PLATFORM module
         try:
-            self.access_platform = importlib.import_module(config("ACCESS_PLATFORM"))
+            self.access_platform = importlib.import_module(
+                settings.get_settings().access_platform
+            )
         except Exception:
-            message = f'❌ UNABLE TO IMPORT MODULE: {config("ACCESS_PLATFORM")}'
+            message = (
+                f"❌ UNABLE TO IMPORT MODULE: {settings.get_settings().access_platform}"
+            )
             status_logger.exception(message)
             raise
 
@@ -704,8 +957,25 @@ class DistilleryService(rpyc.Service):
             raise
 
         variables = {"alchemist_regenerate": True}
+        started = time.time()
+        since = None
+        invalidations = []
 
         try:
+            if incremental and not component_id:
+                since = get_regenerate_since(collection_id)
+                if since:
+                    status_logger.info(
+                        "ℹ️  REGENERATING ITEMS MODIFIED IN ARCHIVESSPACE SINCE: {}".format(
+                            datetime.datetime.fromtimestamp(since).isoformat(
+                                sep=" ", timespec="seconds"
+                            )
+                        )
+                    )
+                else:
+                    status_logger.warning(
+                        "⚠️  NO PREVIOUS REGENERATION RECORDED; REGENERATING ALL ITEMS"
+                    )
             if component_id:
                 # regenerate files for one item
                 status_logger.info(f"🟢 BEGIN REGENERATING: {component_id}")
@@ -713,99 +983,362 @@ class DistilleryService(rpyc.Service):
                 variables["arrangement"] = get_arrangement(variables["archival_object"])
                 accessDistiller.archival_object_level_processing(variables)
                 accessDistiller.transfer_archival_object_derivative_files(variables)
+                update_regenerate_index([get_regenerate_index_entry(variables)])
                 archival_object_path = "/".join(
                     [
-                        config("ALCHEMIST_URL_PREFIX"),
+                        settings.get_settings().alchemist_url_prefix,
                         variables["arrangement"]["collection_id"],
                         variables["archival_object"]["component_id"],
                     ]
                 )
-                if config("ALCHEMIST_CLOUDFRONT_DISTRIBUTION_ID", default=False):
-                    self.access_platform.invalidate_cloudfront_path(
-                        path=f"/{archival_object_path}/*"
+                if settings.get_settings().alchemist_cloudfront_distribution_id:
+                    invalidations.append(
+                        self.access_platform.request_cloudfront_invalidation(
+                            f"/{archival_object_path}/*", status_logger
+                        )
                     )
                 status_logger.info(
                     "☑️  ALCHEMIST FILES REGENERATED: [**{}**]({})".format(
                         variables["archival_object"]["component_id"],
                         "/".join(
                             [
-                                config("ALCHEMIST_BASE_URL").rstrip("/"),
+                                settings.get_settings().alchemist_base_url,
                                 archival_object_path,
                             ]
                         ),
                     )
                 )
             elif collection_id:
-                # TODO DRY this out
                 # regenerate files for a collection
                 status_logger.info(f"🟢 BEGIN REGENERATING ITEMS FOR: {collection_id}")
                 archival_object_prefixes = accessDistiller.regenerate_collection(
                     collection_id
                 )
-                if config("ALCHEMIST_CLOUDFRONT_DISTRIBUTION_ID", default=False):
-                    # invalidate existing paths so the status_logger links work
-                    self.access_platform.invalidate_cloudfront_path(
-                        path=f'/{config("ALCHEMIST_URL_PREFIX")}/{collection_id}/*'
-                    )
-                for archival_object_prefix in archival_object_prefixes:
-                    component_id = archival_object_prefix.split("/")[-2]
-                    variables["archival_object"] = find_archival_object(component_id)
-                    variables["arrangement"] = get_arrangement(
-                        variables["archival_object"]
+                if since:
+                    archival_object_prefixes = find_modified_archival_object_prefixes(
+                        since, archival_object_prefixes
                     )
-                    accessDistiller.archival_object_level_processing(variables)
-                    accessDistiller.transfer_archival_object_derivative_files(variables)
-                    status_logger.info(
-                        "☑️  ALCHEMIST FILES REGENERATED: [**{}**]({}/{}/{}/{})".format(
-                            variables["archival_object"]["component_id"],
-                            config("ALCHEMIST_BASE_URL").rstrip("/"),
-                            config("ALCHEMIST_URL_PREFIX"),
-                            variables["arrangement"]["collection_id"],
-                            variables["archival_object"]["component_id"],
+                if settings.get_settings().alchemist_cloudfront_distribution_id:
+                    # invalidate existing paths so the status_logger links work
+                    invalidations.append(
+                        self.access_platform.request_cloudfront_invalidation(
+                            f"/{settings.get_settings().alchemist_url_prefix}/{collection_id}/*",
+                            status_logger,
                         )
                     )
-                if config("ALCHEMIST_CLOUDFRONT_DISTRIBUTION_ID", default=False):
+                regenerated = []
+                try:
+                    regenerate_archival_object_prefixes(
+                        accessDistiller,
+                        archival_object_prefixes,
+                        status_logger,
+                        on_regenerated=lambda variables: regenerated.append(
+                            get_regenerate_index_entry(variables)
+                        ),
+                        cancel_event=self.cancel_event,
+                    )
+                finally:
+                    # record rendered items even when the run does not finish
+                    update_regenerate_index(regenerated)
+                if settings.get_settings().alchemist_cloudfront_distribution_id:
                     # invalidate again to ensure all paths serve fresh content
-                    self.access_platform.invalidate_cloudfront_path(
-                        path=f'/{config("ALCHEMIST_URL_PREFIX")}/{collection_id}/*'
+                    invalidations.append(
+                        self.access_platform.request_cloudfront_invalidation(
+                            f"/{settings.get_settings().alchemist_url_prefix}/{collection_id}/*",
+                            status_logger,
+                        )
                     )
+                update_regenerate_index([], scope=collection_id, started=started)
             else:
-                # TODO DRY this out
                 # regenerate files for all items
                 status_logger.info("🟢 BEGIN REGENERATING ALL")
                 archival_object_prefixes = accessDistiller.regenerate_all()
-                if config("ALCHEMIST_CLOUDFRONT_DISTRIBUTION_ID", default=False):
-                    # invalidate existing paths so the status_logger links work
-                    self.access_platform.invalidate_cloudfront_path()
-                for archival_object_prefix in archival_object_prefixes:
-                    component_id = archival_object_prefix.split("/")[-2]
-                    variables["archival_object"] = find_archival_object(component_id)
-                    variables["arrangement"] = get_arrangement(
-                        variables["archival_object"]
+                if since:
+                    archival_object_prefixes = find_modified_archival_object_prefixes(
+                        since, archival_object_prefixes
                     )
-                    accessDistiller.archival_object_level_processing(variables)
-                    accessDistiller.transfer_archival_object_derivative_files(variables)
-                    status_logger.info(
-                        "☑️  ALCHEMIST FILES REGENERATED: [**{}**]({}/{}/{}/{})".format(
-                            variables["archival_object"]["component_id"],
-                            config("ALCHEMIST_BASE_URL").rstrip("/"),
-                            config("ALCHEMIST_URL_PREFIX"),
-                            variables["arrangement"]["collection_id"],
-                            variables["archival_object"]["component_id"],
+                if settings.get_settings().alchemist_cloudfront_distribution_id:
+                    # invalidate existing paths so the status_logger links work
+                    invalidations.append(
+                        self.access_platform.request_cloudfront_invalidation(
+                            "/*", status_logger
                         )
                     )
-                if config("ALCHEMIST_CLOUDFRONT_DISTRIBUTION_ID", default=False):
+                regenerated = []
+                try:
+                    regenerate_archival_object_prefixes(
+                        accessDistiller,
+                        archival_object_prefixes,
+                        status_logger,
+                        on_regenerated=lambda variables: regenerated.append(
+                            get_regenerate_index_entry(variables)
+                        ),
+                        cancel_event=self.cancel_event,
+                    )
+                finally:
+                    # record rendered items even when the run does not finish
+                    update_regenerate_index(regenerated)
+                if settings.get_settings().alchemist_cloudfront_distribution_id:
                     # invalidate again to ensure all paths serve fresh content
-                    self.access_platform.invalidate_cloudfront_path()
+                    invalidations.append(
+                        self.access_platform.request_cloudfront_invalidation(
+                            "/*", status_logger
+                        )
+                    )
+                update_regenerate_index([], scope="_", started=started)
+            if invalidations:
+                status_logger.info("⏳ WAITING FOR CLOUDFRONT INVALIDATIONS")
+                for invalidation in invalidations:
+                    invalidation.result()
+        except jobqueue.JobCancelled:
+            raise
         except Exception as e:
-            status_logger.error("❌ SOMETHING WENT WRONG")
+            status_logger.error(
+                "❌ SOMETHING WENT WRONG", extra={"event": "failed", "error": e}
+            )
             status_logger.error(e)
             logger.exception("‼️")
             raise
         # complete the process if there is no error
         else:
             # send the character that stops javascript reloading in the web ui
-            status_logger.info(f"🏁")
+            status_logger.info(f"🏁", extra={"event": "finished"})
+
+
+def regenerate_archival_object_prefixes(
+    access_distiller,
+    archival_object_prefixes,
+    status_logger,
+    on_regenerated=None,
+    cancel_event=None,
+):
+    """Regenerate access files for archival object prefixes concurrently.
+
+    Each prefix passes through three stages: fetching metadata from
+    ArchivesSpace, rendering the page and manifest, and publishing the files.
+    Every stage has its own concurrency limit so that, for example, the number
+    of simultaneous ArchivesSpace requests can be kept below its rate limit
+    while rendering and uploading continue for other items.
+
+    Prefixes are submitted as they are produced, a bounded number at a time,
+    so a generator that is still listing the bucket can be passed in. The optional on_regenerated callable
+    receives the variables of each regenerated item. Raises the first exception
+    that occurs, or JobCancelled once cancel_event is set, after cancelling any
+    prefixes that have not started.
+    """
+    limits = {
+        "fetch": settings.get_settings().alchemist_regenerate_fetch_workers,
+        "render": settings.get_settings().alchemist_regenerate_render_workers,
+        "publish": settings.get_settings().alchemist_regenerate_publish_workers,
+    }
+    stages = {
+        stage: threading.BoundedSemaphore(limit) for stage, limit in limits.items()
+    }
+    progress = {"submitted": 0, "regenerated": 0}
+    progress_lock = threading.Lock()
+
+    def regenerate(archival_object_prefix):
+        component_id = archival_object_prefix.split("/")[-2]
+        started = time.time()
+        # NOTE each item needs its own variables because they run concurrently
+        variables = {"alchemist_regenerate": True}
+        with stages["fetch"]:
+            variables["archival_object"] = find_archival_object(component_id)
+            variables["arrangement"] = get_arrangement(variables["archival_object"])
+        with stages["render"]:
+            access_distiller.archival_object_level_processing(variables)
+        with stages["publish"]:
+            access_distiller.transfer_archival_object_derivative_files(variables)
+        with progress_lock:
+            if on_regenerated:
+                on_regenerated(variables)
+            progress["regenerated"] += 1
+            count = f'{progress["regenerated"]}/{progress["submitted"]}'
+        status_logger.info(
+            "☑️  ALCHEMIST FILES REGENERATED ({}): [**{}**]({}/{}/{}/{})".format(
+                count,
+                variables["archival_object"]["component_id"],
+                settings.get_settings().alchemist_base_url,
+                settings.get_settings().alchemist_url_prefix,
+                variables["arrangement"]["collection_id"],
+                variables["archival_object"]["component_id"],
+            ),
+            extra={
+                "event": "regenerated",
+                "archival_object": component_id,
+                "stage": "access",
+                "duration": time.time() - started,
+            },
+        )
+        return variables
+
+    # NOTE enough workers for every stage to run at its limit at the same time
+    workers = sum(limits.values())
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = set()
+        exception = None
+        for archival_object_prefix in archival_object_prefixes:
+            if cancel_event and cancel_event.is_set():
+                break
+            # keep a bounded number of prefixes queued and stop listing once
+            # one has failed
+            if len(futures) >= 2 * workers:
+                done, futures = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                exception = get_first_exception(done)
+                if exception:
+                    break
+            futures.add(executor.submit(regenerate, archival_object_prefix))
+            with progress_lock:
+                progress["submitted"] += 1
+        while futures and not exception:
+            if cancel_event and cancel_event.is_set():
+                break
+            done, futures = concurrent.futures.wait(
+                futures, timeout=1, return_when=concurrent.futures.FIRST_EXCEPTION
+            )
+            exception = get_first_exception(done)
+        for future in futures:
+            future.cancel()
+        if exception:
+            raise exception
+    # NOTE items already started are finished before the job stops
+    check_cancelled(cancel_event, status_logger, "alchemist_regenerate")
+    status_logger.info(f'🔢 ITEMS REGENERATED: {progress["regenerated"]}')
+    return progress["regenerated"]
+
+
+def check_cancelled(cancel_event, status_logger, job):
+    """Log and raise JobCancelled once the cancel_event of a job is set."""
+    if cancel_event and cancel_event.is_set():
+        status_logger.error("❌ CANCELLED", extra={"event": "cancelled"})
+        raise jobqueue.JobCancelled(job)
+
+
+def get_first_exception(futures):
+    """Return the exception of the first failed future, if any."""
+    for future in futures:
+        if future.exception():
+            return future.exception()
+
+
+def get_regenerate_index_file():
+    """Return the path of the index of ArchivesSpace versions of published pages."""
+    return Path(settings.get_settings().alchemist_regenerate_index)
+
+
+def load_regenerate_index():
+    """Return the index of ArchivesSpace versions that pages were rendered from.
+
+    FORMAT: {
+        "archival_objects": {
+            "component_id": {
+                "uri": "/repositories/2/archival_objects/1",
+                "collection_id": "CollectionID",
+                "ancestors": ["/repositories/2/resources/1"],
+                "lock_version": 0
+            }
+        },
+        "runs": {"CollectionID": 1672531200.0, "_": 1672531200.0}
+    }
+    """
+    try:
+        with open(get_regenerate_index_file()) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"archival_objects": {}, "runs": {}}
+
+
+def update_regenerate_index(entries, scope="", started=None):
+    """Merge entries into the index and record when a completed run started.
+
+    The scope is a collection_id or "_" for all collections.
+    """
+    with regenerate_index_lock:
+        index = load_regenerate_index()
+        for entry in entries:
+            index["archival_objects"][entry["component_id"]] = {
+                key: value for key, value in entry.items() if key != "component_id"
+            }
+        if scope and started:
+            index["runs"][scope] = started
+        index_file = get_regenerate_index_file()
+        # write to a temporary file first so a crash cannot truncate the index
+        with open(index_file.with_suffix(".tmp"), "w") as f:
+            f.write(json.dumps(index))
+        os.replace(index_file.with_suffix(".tmp"), index_file)
+
+
+def get_regenerate_index_entry(variables):
+    """Return the index entry for the archival object a page was rendered from."""
+    return {
+        "component_id": variables["archival_object"]["component_id"],
+        "uri": variables["archival_object"]["uri"],
+        "collection_id": variables["arrangement"]["collection_id"],
+        "ancestors": [
+            ancestor["ref"] for ancestor in variables["archival_object"]["ancestors"]
+        ],
+        "lock_version": variables["archival_object"].get("lock_version"),
+    }
+
+
+def get_regenerate_since(collection_id=""):
+    """Return the start time of the last completed run covering the scope."""
+    runs = load_regenerate_index()["runs"]
+    if collection_id:
+        # a run for all collections also covers this collection
+        since = max(runs.get(collection_id, 0), runs.get("_", 0))
+    else:
+        since = runs.get("_", 0)
+    return since or None
+
+
+def find_modified_archival_object_prefixes(since, archival_object_prefixes):
+    """Yield the listed prefixes of items affected by ArchivesSpace changes.
+
+    An item is affected when its own archival object or any of its ancestors,
+    including the resource, has been modified since the given timestamp.
+    Listed items missing from the index, such as those published before it
+    existed, are yielded as well so that they are regenerated and indexed.
+    Archival objects with the lock_version they were rendered from are not
+    considered modified.
+    """
+    modified_uris = set()
+    for record_type in ["archival_objects", "resources"]:
+        # NOTE subtract a minute to allow for clock differences between servers
+        ids = archivessnake_get(
+            f"/repositories/2/{record_type}?all_ids=true&modified_since={int(since) - 60}"
+        ).json()
+        modified_uris.update([f"/repositories/2/{record_type}/{id}" for id in ids])
+    index = load_regenerate_index()["archival_objects"]
+    # NOTE records changed within the minute before the last run started may
+    # have been rendered by it already
+    lock_versions = {
+        entry["uri"]: entry.get("lock_version") for entry in index.values()
+    }
+    ids = [
+        uri.rsplit("/", 1)[-1]
+        for uri in modified_uris
+        if uri in lock_versions and lock_versions[uri] is not None
+    ]
+    # NOTE id_set must not be larger than the maximum page size of 250
+    for i in range(0, len(ids), 250):
+        id_set = "&".join(f"id_set[]={id}" for id in ids[i : i + 250])
+        for record in archivessnake_get(
+            f"/repositories/2/archival_objects?{id_set}"
+        ).json():
+            if record["lock_version"] == lock_versions[record["uri"]]:
+                modified_uris.discard(record["uri"])
+    logger.debug(f"🐞 MODIFIED URIS: {modified_uris}")
+    for archival_object_prefix in archival_object_prefixes:
+        entry = index.get(archival_object_prefix.split("/")[-2])
+        if (
+            not entry
+            or entry["uri"] in modified_uris
+            or modified_uris.intersection(entry["ancestors"])
+        ):
+            yield archival_object_prefix
 
 
 def get_collection_data(collection_id):
@@ -849,7 +1382,7 @@ def get_collection_uri(collection_id):
     max_time=1800,
 )
 def archivessnake_get(uri):
-    return asnake_client.get(uri)
+    return get_asnake_client().get(uri)
 
 
 @backoff.on_exception(
@@ -864,7 +1397,7 @@ def archivessnake_get(uri):
     max_time=1800,
 )
 def archivessnake_post(uri, object):
-    return asnake_client.post(uri, json=object)
+    return get_asnake_client().post(uri, json=object)
 
 
 @backoff.on_exception(
@@ -879,7 +1412,7 @@ def archivessnake_post(uri, object):
     max_time=1800,
 )
 def archivessnake_delete(uri):
-    return asnake_client.delete(uri)
+    return get_asnake_client().delete(uri)
 
 
 def get_collection_tree(collection_uri):
@@ -1383,7 +1916,7 @@ def construct_file_version(variables):
         variables["preservation_file_info"]["filesize"]
     )
     file_key = str(variables["preservation_file_info"]["filepath"])[
-        len(f'{config("WORK_PRESERVATION_FILES")}/') :
+        len(f"{settings.get_settings().work_preservation_files}/") :
     ]
     file_version[
         "file_uri"
@@ -1429,7 +1962,7 @@ def update_digital_object(uri, data):
     return response
 
 
-def prepare_preservation_files(variables):
+def prepare_preservation_files(variables, status_logger):
     """Copy preservation files."""
     for filepath in variables["filepaths"]:
         variables["original_file_path"] = filepath
@@ -1443,9 +1976,9 @@ def prepare_preservation_files(variables):
             filepath_components,
         )
         logger.debug(f"🐞 PRESERVATION_FILE_KEY: {preservation_file_key}")
-        preservation_file_path = Path(config("WORK_PRESERVATION_FILES")).joinpath(
-            preservation_file_key
-        )
+        preservation_file_path = Path(
+            settings.get_settings().work_preservation_files
+        ).joinpath(preservation_file_key)
         logger.debug(f"🐞 PRESERVATION_FILE_PATH: {preservation_file_path}")
         try:
             preservation_file_path.parent.mkdir(parents=True, exist_ok=True)
@@ -1457,10 +1990,116 @@ def prepare_preservation_files(variables):
                 )
             )
         else:
-            status_logger.info(f"☑️  ORIGINAL FILE COPIED: {preservation_file_key}")
+            status_logger.info(
+                f"☑️  ORIGINAL FILE COPIED: {preservation_file_key}",
+                extra={
+                    "event": "file_copied",
+                    "archival_object": variables["archival_object"]["component_id"],
+                    "stage": "preservation",
+                    "bytes": preservation_file_path.stat().st_size,
+                },
+            )
 
 
+def remove_stillage_directory(directory, status_logger):
+    """Delete a stillage directory without starving other work of disk time."""
+    command = ["/bin/rm", "-rf", directory]
+    if settings.get_settings().work_ionice_cmd:
+        # NOTE the idle class only uses the disk when nothing else wants it
+        command = [settings.get_settings().work_ionice_cmd, "-c", "3"] + command
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode:
+        # NOTE the files were transferred already, so the run carries on
+        status_logger.warning(
+            f"⚠️  UNABLE TO DELETE STILLAGE DIRECTORY: {directory}",
+            extra={
+                "event": "stillage_not_deleted",
+                "error": result.stderr.strip() or f"exit status {result.returncode}",
+            },
+        )
+        return
+    logger.info(f"🗑️  STILLAGE DIRECTORY DELETED: {directory}")
+
+
+def get_batch_journal_file(batch_directory):
+    """Return the path of the journal of finished steps for a batch."""
+    return Path(batch_directory).joinpath("journal.jsonl")
+
+
+def load_batch_journal(batch_directory):
+    """Return the finished steps of each archival object in a batch.
+
+    FORMAT: {"component_id": {("step", "file"): data}}
+    """
+    journal = {}
+    journal_file = get_batch_journal_file(batch_directory)
+    try:
+        lines = journal_file.read_text(encoding="utf-8").splitlines(keepends=True)
+    except FileNotFoundError:
+        return journal
+    if lines and not lines[-1].endswith("\n"):
+        # end a line cut short by a crash so the next step is written on a
+        # line of its own
+        with open(journal_file, "a", encoding="utf-8") as f:
+            f.write("\n")
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            # NOTE a line cut short by a crash is not a finished step
+            continue
+        journal.setdefault(entry["archival_object"], {})[
+            (entry["step"], entry.get("file", ""))
+        ] = entry.get("data")
+    return journal
+
+
+def is_batch_step_done(journal, archival_object, step, file=""):
+    return (step, file) in journal.get(archival_object, {})
+
+
+def record_batch_step(
+    batch_directory, journal, archival_object, step, file="", data=None
+):
+    """Append a finished step to the batch journal before moving on."""
+    entry = {"archival_object": archival_object, "step": step, "time": time.time()}
+    if file:
+        entry["file"] = file
+    if data is not None:
+        entry["data"] = data
+    with open(get_batch_journal_file(batch_directory), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        # NOTE the step must survive a crash of the whole machine
+        os.fsync(f.fileno())
+    journal.setdefault(archival_object, {})[(step, file)] = data
+
+
+def run_job(method, cancel_event, **kwargs):
+    """Call a service method for a queued job with its own service instance."""
+    service = DistilleryService()
+    service.cancel_event = cancel_event
+    getattr(service, method)(**kwargs)
+
+
+# NOTE the job queue is only started by the service on the WORK server
+job_queue = None
+
 if __name__ == "__main__":
     # fmt: off
     from rpyc.utils.server import ThreadedServer
+    configure_logging()
+    # stop here with a ValueError when any setting is invalid
+    settings.check_settings()
+    job_queue = jobqueue.JobQueue(
+        settings.get_settings().work_job_database,
+        handlers={
+            method: functools.partial(run_job, method)
+            for method in ["validate", "run", "alchemist_regenerate"]
+        },
+        # validate and run both use INITIAL_ORIGINAL_FILES and the status logger
+        groups={"validate": "batch", "run": "batch", "alchemist_regenerate": "alchemist"},
+        limits={"batch": 1, "alchemist": settings.get_settings().alchemist_job_limit},
+    )
+    job_queue.start()
     ThreadedServer(DistilleryService, port=config("DISTILLERY_RPYC_PORT")).start()
@@ -0,0 +1,162 @@
+# CALTECH ARCHIVES AND SPECIAL COLLECTIONS
+# digital object preservation workflow
+
+# persistent job queue for the services on the WORK server
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobQueue:
+    """Run queued jobs from an SQLite database with per-group concurrency limits.
+
+    Each job type belongs to a group, and no more than the limit of jobs in a
+    group run at the same time; job types that share files, like validate and
+    run, share a group. Queued jobs start in order of priority (highest first)
+    and then age, and they survive a restart of the service. Jobs that were
+    running when the service stopped are marked failed.
+
+    Handlers are called with a threading.Event, set when cancellation of the
+    running job is requested, followed by the keyword arguments of the job.
+    """
+
+    def __init__(self, database, handlers, groups, limits):
+        self.database = database
+        self.handlers = handlers
+        self.groups = groups
+        self.limits = limits
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        # job_id: threading.Event
+        self.running = {}
+        with self.connect() as connection:
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    kwargs TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    error TEXT
+                )"""
+            )
+            connection.execute(
+                "UPDATE jobs SET state = 'failed', finished = ?, error = ? WHERE state = 'running'",
+                (time.time(), "interrupted by a service restart"),
+            )
+
+    def connect(self):
+        connection = sqlite3.connect(self.database, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def start(self):
+        threading.Thread(target=self.schedule, daemon=True).start()
+
+    def enqueue(self, job_type, kwargs, priority=0):
+        if job_type not in self.handlers:
+            raise ValueError(f"unknown job type: {job_type}")
+        with self.condition:
+            with self.connect() as connection:
+                job_id = connection.execute(
+                    "INSERT INTO jobs (type, kwargs, priority, created) VALUES (?, ?, ?, ?)",
+                    (job_type, json.dumps(kwargs), priority, time.time()),
+                ).lastrowid
+            self.condition.notify()
+        logger.info(f"📥 JOB QUEUED: {job_id} {job_type}")
+        return job_id
+
+    def jobs(self, limit=100):
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def job(self, job_id):
+        with self.connect() as connection:
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def cancel(self, job_id):
+        """Cancel a queued job or ask a running job to stop; return the state."""
+        with self.condition:
+            with self.connect() as connection:
+                connection.execute(
+                    "UPDATE jobs SET state = 'cancelled', finished = ? WHERE id = ? AND state = 'queued'",
+                    (time.time(), job_id),
+                )
+            if job_id in self.running:
+                self.running[job_id].set()
+        job = self.job(job_id)
+        return job["state"] if job else None
+
+    def schedule(self):
+        while True:
+            with self.condition:
+                self.start_ready_jobs()
+                # NOTE a timeout also picks up jobs queued by other processes
+                self.condition.wait(timeout=5)
+
+    def start_ready_jobs(self):
+        with self.connect() as connection:
+            running = connection.execute(
+                "SELECT type FROM jobs WHERE state = 'running'"
+            ).fetchall()
+            queued = connection.execute(
+                "SELECT * FROM jobs WHERE state = 'queued' ORDER BY priority DESC, id"
+            ).fetchall()
+        counts = {}
+        for row in running:
+            group = self.groups.get(row["type"], row["type"])
+            counts[group] = counts.get(group, 0) + 1
+        for row in queued:
+            group = self.groups.get(row["type"], row["type"])
+            if counts.get(group, 0) >= self.limits.get(group, 1):
+                continue
+            counts[group] = counts.get(group, 0) + 1
+            with self.connect() as connection:
+                connection.execute(
+                    "UPDATE jobs SET state = 'running', started = ? WHERE id = ?",
+                    (time.time(), row["id"]),
+                )
+            self.running[row["id"]] = threading.Event()
+            threading.Thread(
+                target=self.run_job,
+                args=(row["id"], row["type"], json.loads(row["kwargs"])),
+                daemon=True,
+            ).start()
+
+    def run_job(self, job_id, job_type, kwargs):
+        logger.info(f"▶️  JOB STARTED: {job_id} {job_type}")
+        state, error = "succeeded", None
+        try:
+            self.handlers[job_type](self.running[job_id], **kwargs)
+        except JobCancelled:
+            state = "cancelled"
+        except Exception as e:
+            logger.exception("‼️")
+            state, error = "failed", str(e)
+        with self.condition:
+            with self.connect() as connection:
+                connection.execute(
+                    "UPDATE jobs SET state = ?, finished = ?, error = ? WHERE id = ?",
+                    (state, time.time(), error, job_id),
+                )
+            del self.running[job_id]
+            self.condition.notify()
+        logger.info(f"⏹  JOB {state.upper()}: {job_id} {job_type}")
@@ -1,48 +1,66 @@
+import concurrent.futures
+import contextlib
+import fcntl
 import json
 import logging
 import os
+import re
 import sh
 import shutil
 import tempfile
+import threading
+import time
 import urllib.parse
 
-import markdown
+import boto3
+import botocore
+import botocore.config
 import rpyc
 
 from datetime import datetime
 from pathlib import Path
 
 from decouple import config  # pypi: python-decouple
-from markdown_link_attr_modifier import (
-    LinkAttrModifierExtension,
-)  # pypi: markdown-link-attr-modifier
 
 import distillery
+import statuslogger
 
-logging.config.fileConfig(
-    # set the logging configuration in the settings.ini file
-    Path(__file__)
-    .resolve()
-    .parent.joinpath("settings.ini")
-)
 logger = logging.getLogger("oralhistories")
 
 
+@distillery.per_process
+def get_resolver_client():
+    """Return the client shared by all interviews setting resolver redirects."""
+    return boto3.client(
+        "s3",
+        region_name=config("DISTILLERY_AWS_REGION", default="us-west-2"),
+        aws_access_key_id=config("DISTILLERY_AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=config("DISTILLERY_AWS_SECRET_ACCESS_KEY"),
+        config=botocore.config.Config(
+            max_pool_connections=config(
+                "ORALHISTORIES_RECONCILE_WORKERS", default=8, cast=int
+            )
+        ),
+    )
+
+
 @rpyc.service
 class OralHistoriesService(rpyc.Service):
     @rpyc.exposed
     def run(self, component_id="", update=False, publish=False, logfile=""):
-        if component_id:
-            self.status_logger = logging.getLogger(component_id)
-        else:
-            self.status_logger = logging.getLogger("_")
-        self.status_logger.setLevel(logging.INFO)
-        status_handler = logging.FileHandler(logfile)
-        status_handler.setLevel(logging.INFO)
-        status_handler.setFormatter(StatusFormatter("%(message)s"))
-        self.status_logger.addHandler(status_handler)
-
-        self.tmp_oralhistories_repository = self.clone_oralhistories_repository()
+        self.status_logger = statuslogger.create_status_logger(logfile)
+        self.tmp_oralhistories_repository = None
+        try:
+            self._run(component_id, update, publish)
+        finally:
+            if self.tmp_oralhistories_repository:
+                remove_oralhistories_worktree(self.tmp_oralhistories_repository)
+            statuslogger.close_status_logger(self.status_logger)
+
+    def _run(self, component_id, update, publish):
+        # NOTE only one transcript directory is touched when a component_id
+        # is given, so the rest of the repository is left out of the worktree
+        self.tmp_oralhistories_repository = add_oralhistories_worktree(component_id)
         # update github workflow files
         self.copy_github_workflow_changes()
         self.add_commit_push()
@@ -103,112 +121,7 @@ class OralHistoriesService(rpyc.Service):
             git_cmd("-C", self.tmp_oralhistories_repository, "tag", tagname)
             git_cmd("-C", self.tmp_oralhistories_repository, "push", "origin", tagname)
             # update ArchivesSpace records
-            for line in s3sync_output.splitlines():
-                logger.info(f"line: {line}")
-                # look for the digital_object
-                self.digital_object_uri = distillery.find_digital_object(
-                    f'{line.split("/")[-2]}'
-                )
-                if not self.digital_object_uri:
-                    logger.warning(
-                        f'⚠️  DIGITAL OBJECT NOT FOUND: {line.split("/")[-2]}'
-                    )
-                    continue
-                digital_object = distillery.archivessnake_get(
-                    self.digital_object_uri
-                ).json()
-                base_url = "/".join(
-                    [
-                        config("ALCHEMIST_BASE_URL").rstrip("/"),
-                        config("ORALHISTORIES_URL_PATH_PREFIX"),
-                    ]
-                )
-                file_uri = "/".join([base_url, line.split("/")[-2]])
-                if line.split()[0] == "upload:":
-                    if line.split("/")[-1] == "index.html":
-                        # add file_version to digital_object
-                        file_versions = [
-                            file_version["file_uri"]
-                            for file_version in digital_object["file_versions"]
-                        ]
-                        if file_uri not in file_versions:
-                            file_version = {"file_uri": file_uri, "publish": True}
-                            digital_object["publish"] = True
-                            digital_object["file_versions"].append(file_version)
-                            distillery.archivessnake_post(
-                                self.digital_object_uri, digital_object
-                            )
-                            logger.info(
-                                f"☑️  DIGITAL OBJECT FILE VERSION ADDED: {file_uri}"
-                            )
-                            logger.info(
-                                f'☑️  DIGITAL OBJECT PUBLISHED: {line.split()[-1].split("/")[-2]}'
-                            )
-                        else:
-                            logger.info(
-                                f"ℹ️  EXISTING DIGITAL OBJECT FILE VERSION FOUND: {file_uri}"
-                            )
-                        # set a redirect in the resolver
-                        if config("RESOLVER_BUCKET", default=""):
-                            self.set_resolver_redirect(
-                                "{}:{}".format(
-                                    config("RESOLVER_ORALHISTORIES_URL_PATH_PREFIX"),
-                                    f'{line.split("/")[-2]}',
-                                ),
-                                file_uri,
-                            )
-                    else:
-                        # look for an existing digital_object_component
-                        digital_object_component_uri = (
-                            self.find_digital_object_component(f'{line.split("/")[-1]}')
-                        )
-                        if digital_object_component_uri:
-                            logger.info(
-                                f'ℹ️  EXISTING DIGITAL OBJECT COMPONENT FOUND: {line.split("/")[-1]}'
-                            )
-                            # no updates needed for existing record
-                            continue
-                        # create new digital_object_component
-                        if line.split(".")[-1] == "pdf":
-                            label = "PDF Asset"
-                        else:
-                            label = f'{line.rsplit(".")[-1].upper()} Asset: {line.split("/")[-1].rsplit(".", maxsplit=1)[0].split("-", maxsplit=3)[-1]}'
-                        self.create_digital_object_component(
-                            label, line.split("/")[-2], line.split("/")[-1]
-                        )
-                if line.split()[0] == "delete:":
-                    if line.split(".")[-1] == "html":
-                        # remove file_version from digital_object
-                        file_versions = [
-                            file_version
-                            for file_version in digital_object["file_versions"]
-                            if not (file_version["file_uri"] == file_uri)
-                        ]
-                        digital_object["publish"] = False
-                        digital_object["file_versions"] = file_versions
-                        distillery.archivessnake_post(
-                            self.digital_object_uri, digital_object
-                        )
-                        logger.info(
-                            f'☑️  DIGITAL OBJECT UNPUBLISHED: {line.split("/")[-2]}'
-                        )
-                        logger.info(
-                            f"🔥 DIGITAL OBJECT FILE VERSION DELETED: {file_uri}"
-                        )
-                        # TODO determine if resolver entry should be deleted
-                    else:
-                        # look for an existing digital_object_component
-                        digital_object_component_uri = (
-                            self.find_digital_object_component(f'{line.split("/")[-1]}')
-                        )
-                        if digital_object_component_uri:
-                            # delete the digital_object_component
-                            distillery.archivessnake_delete(
-                                digital_object_component_uri
-                            )
-                            logger.info(
-                                f'🔥 DIGITAL OBJECT COMPONENT DELETED: {line.split("/")[-1]}'
-                            )
+            digital_object_uris = self.reconcile_digital_objects(s3sync_output)
             if component_id:
                 if config("RESOLVER_BUCKET", default=""):
                     self.status_logger.info(
@@ -223,7 +136,8 @@ class OralHistoriesService(rpyc.Service):
                     "☑️ published [**{}** Digital Object record]({}/resolve/readonly?uri={}) in ArchivesSpace".format(
                         component_id,
                         config("ASPACE_STAFF_URL").rstrip("/"),
-                        self.digital_object_uri,
+                        digital_object_uris.get(component_id)
+                        or distillery.find_digital_object(component_id),
                     )
                 )
             else:
@@ -235,11 +149,11 @@ class OralHistoriesService(rpyc.Service):
         if update:
             if component_id:
                 # update a single record
-                self.component_id = component_id
-                self.transcript_directory = Path(
-                    self.tmp_oralhistories_repository
-                ).joinpath("transcripts", component_id)
-                self.update_markdown_metadata()
+                self.update_markdown_metadata(
+                    Path(self.tmp_oralhistories_repository).joinpath(
+                        "transcripts", component_id
+                    )
+                )
             else:
                 # update all records (example case: interviewer name change)
                 transcript_directories = [
@@ -249,9 +163,7 @@ class OralHistoriesService(rpyc.Service):
                     .iterdir()
                     if i.is_dir()
                 ]
-                for self.transcript_directory in transcript_directories:
-                    self.component_id = self.transcript_directory.name
-                    self.update_markdown_metadata()
+                self.update_all_markdown_metadata(transcript_directories)
             # NOTE use component_id instead of self.component_id because
             # component_id can be an empty string when updating all records
             self.add_commit_push(component_id, update)
@@ -261,38 +173,9 @@ class OralHistoriesService(rpyc.Service):
                 )
             else:
                 self.status_logger.info("☑️ updated all metadata in GitHub")
-        # cleanup
-        shutil.rmtree(self.tmp_oralhistories_repository)
 
         # send the character that stops javascript reloading in the web ui
-        self.status_logger.info("🏁")
-
-    def clone_oralhistories_repository(self):
-        tmp_oralhistories_repository = tempfile.mkdtemp()
-        git_cmd = sh.Command(config("WORK_GIT_CMD"))
-        # use a specific ssh identity_file when cloning this repository
-        git_cmd(
-            "clone",
-            f'git@github.com:{config("ORALHISTORIES_GITHUB_REPO")}.git',
-            "--depth",
-            "1",
-            tmp_oralhistories_repository,
-            _env={
-                "GIT_SSH_COMMAND": f'ssh -i {config("ORALHISTORIES_GITHUB_SSH_KEY")}'
-            },
-        )
-        logger.info(
-            f"☑️  GIT REPOSITORY CLONED TO TEMPORARY DIRECTORY: {tmp_oralhistories_repository}"
-        )
-        # set the ssh identity_file to use with this repository
-        git_cmd(
-            "-C",
-            tmp_oralhistories_repository,
-            "config",
-            "core.sshCommand",
-            f'ssh -i {config("ORALHISTORIES_GITHUB_SSH_KEY")}',
-        )
-        return tmp_oralhistories_repository
+        self.status_logger.info("🏁", extra={"event": "finished"})
 
     def copy_github_workflow_changes(self):
         shutil.copytree(
@@ -308,20 +191,6 @@ class OralHistoriesService(rpyc.Service):
             "-C", self.tmp_oralhistories_repository, "diff-index", "HEAD", "--"
         )
         if diff:
-            git_cmd(
-                "-C",
-                self.tmp_oralhistories_repository,
-                "config",
-                "user.email",
-                config("ORALHISTORIES_GIT_USER_EMAIL"),
-            )
-            git_cmd(
-                "-C",
-                self.tmp_oralhistories_repository,
-                "config",
-                "user.name",
-                config("ORALHISTORIES_GIT_USER_NAME"),
-            )
             if component_id:
                 if update:
                     commit_msg = f"update {component_id}.md metadata"
@@ -332,7 +201,7 @@ class OralHistoriesService(rpyc.Service):
             else:
                 commit_msg = "bulk update metadata"
             git_cmd("-C", self.tmp_oralhistories_repository, "commit", "-m", commit_msg)
-            git_cmd("-C", self.tmp_oralhistories_repository, "push", "origin", "main")
+            push_oralhistories_worktree(self.tmp_oralhistories_repository)
             hash = git_cmd(
                 "-C",
                 self.tmp_oralhistories_repository,
@@ -390,14 +259,18 @@ class OralHistoriesService(rpyc.Service):
         if archival_object.get("linked_agents"):
             for linked_agent in archival_object["linked_agents"]:
                 if linked_agent.get("relator") == "ive":
-                    agent = distillery.archivessnake_get(linked_agent["ref"]).json()
+                    agent = linked_agent.get("_resolved") or get_agent(
+                        linked_agent["ref"]
+                    )
                     # TODO [allow for other than inverted names](https://github.com/caltechlibrary/distillery/issues/24)
                     if agent["display_name"]["name_order"] == "inverted":
                         metadata[
                             "interviewee"
                         ] = f'{agent["display_name"]["rest_of_name"]} {agent["display_name"]["primary_name"]}'
                 if linked_agent.get("relator") == "ivr":
-                    agent = distillery.archivessnake_get(linked_agent["ref"]).json()
+                    agent = linked_agent.get("_resolved") or get_agent(
+                        linked_agent["ref"]
+                    )
                     # TODO [allow for other than inverted names](https://github.com/caltechlibrary/distillery/issues/24)
                     if agent["display_name"]["name_order"] == "inverted":
                         metadata[
@@ -473,8 +346,12 @@ class OralHistoriesService(rpyc.Service):
         )
         return digital_object_post_response.json()["uri"]
 
-    def create_digital_object_component(self, label, fileparent, filename):
-        digital_object_component = {"digital_object": {"ref": self.digital_object_uri}}
+    def create_digital_object_component(
+        self, label, fileparent, filename, digital_object_uri=None
+    ):
+        digital_object_component = {
+            "digital_object": {"ref": digital_object_uri or self.digital_object_uri}
+        }
         digital_object_component["label"] = label
         digital_object_component["component_id"] = filename
         digital_object_component["file_versions"] = [
@@ -487,6 +364,126 @@ class OralHistoriesService(rpyc.Service):
         )
         logger.info(f'✳️  DIGITAL OBJECT COMPONENT CREATED: {response.json()["uri"]}')
 
+    def reconcile_digital_objects(self, s3sync_output):
+        """Update ArchivesSpace for the files changed by the sync.
+
+        Returns the digital_object URI of each changed transcript.
+        """
+        # component_id: [s3sync_output lines]
+        changes = {}
+        for line in s3sync_output.splitlines():
+            logger.info(f"line: {line}")
+            if line.split() and line.split()[0] in ("upload:", "delete:"):
+                changes.setdefault(line.split("/")[-2], []).append(line)
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=config("ORALHISTORIES_RECONCILE_WORKERS", default=8, cast=int)
+        ) as executor:
+            futures = {
+                component_id: executor.submit(
+                    self.reconcile_digital_object, component_id, lines
+                )
+                for component_id, lines in changes.items()
+            }
+            return {
+                component_id: future.result()
+                for component_id, future in futures.items()
+            }
+
+    def reconcile_digital_object(self, component_id, lines):
+        # look for the digital_object
+        digital_object_uri = distillery.find_digital_object(component_id)
+        if not digital_object_uri:
+            logger.warning(f"⚠️  DIGITAL OBJECT NOT FOUND: {component_id}")
+            return None
+        digital_object = distillery.archivessnake_get(digital_object_uri).json()
+        base_url = "/".join(
+            [
+                config("ALCHEMIST_BASE_URL").rstrip("/"),
+                config("ORALHISTORIES_URL_PATH_PREFIX"),
+            ]
+        )
+        file_uri = "/".join([base_url, component_id])
+        file_versions = [
+            file_version["file_uri"] for file_version in digital_object["file_versions"]
+        ]
+        changed = False
+        # NOTE apply all file_version changes with a single update of the
+        # digital_object before any of its components are changed
+        for line in lines:
+            if line.split()[0] == "upload:" and line.split("/")[-1] == "index.html":
+                # add file_version to digital_object
+                if file_uri not in file_versions:
+                    digital_object["publish"] = True
+                    digital_object["file_versions"].append(
+                        {"file_uri": file_uri, "publish": True}
+                    )
+                    file_versions.append(file_uri)
+                    changed = True
+                    logger.info(f"☑️  DIGITAL OBJECT FILE VERSION ADDED: {file_uri}")
+                    logger.info(f"☑️  DIGITAL OBJECT PUBLISHED: {component_id}")
+                else:
+                    logger.info(
+                        f"ℹ️  EXISTING DIGITAL OBJECT FILE VERSION FOUND: {file_uri}"
+                    )
+            if line.split()[0] == "delete:" and line.split(".")[-1] == "html":
+                # remove file_version from digital_object
+                digital_object["publish"] = False
+                digital_object["file_versions"] = [
+                    file_version
+                    for file_version in digital_object["file_versions"]
+                    if not (file_version["file_uri"] == file_uri)
+                ]
+                file_versions = [
+                    file_version["file_uri"]
+                    for file_version in digital_object["file_versions"]
+                ]
+                changed = True
+                logger.info(f"☑️  DIGITAL OBJECT UNPUBLISHED: {component_id}")
+                logger.info(f"🔥 DIGITAL OBJECT FILE VERSION DELETED: {file_uri}")
+                # TODO determine if resolver entry should be deleted
+        if changed:
+            distillery.archivessnake_post(digital_object_uri, digital_object)
+        for line in lines:
+            if line.split()[0] == "upload:":
+                if line.split("/")[-1] == "index.html":
+                    # set a redirect in the resolver
+                    if config("RESOLVER_BUCKET", default=""):
+                        self.set_resolver_redirect(
+                            "{}:{}".format(
+                                config("RESOLVER_ORALHISTORIES_URL_PATH_PREFIX"),
+                                component_id,
+                            ),
+                            file_uri,
+                        )
+                    continue
+                # look for an existing digital_object_component
+                if self.find_digital_object_component(f'{line.split("/")[-1]}'):
+                    logger.info(
+                        f'ℹ️  EXISTING DIGITAL OBJECT COMPONENT FOUND: {line.split("/")[-1]}'
+                    )
+                    # no updates needed for existing record
+                    continue
+                # create new digital_object_component
+                if line.split(".")[-1] == "pdf":
+                    label = "PDF Asset"
+                else:
+                    label = f'{line.rsplit(".")[-1].upper()} Asset: {line.split("/")[-1].rsplit(".", maxsplit=1)[0].split("-", maxsplit=3)[-1]}'
+                self.create_digital_object_component(
+                    label, component_id, line.split("/")[-1], digital_object_uri
+                )
+            if line.split()[0] == "delete:" and line.split(".")[-1] != "html":
+                # look for an existing digital_object_component
+                digital_object_component_uri = self.find_digital_object_component(
+                    f'{line.split("/")[-1]}'
+                )
+                if digital_object_component_uri:
+                    # delete the digital_object_component
+                    distillery.archivessnake_delete(digital_object_component_uri)
+                    logger.info(
+                        f'🔥 DIGITAL OBJECT COMPONENT DELETED: {line.split("/")[-1]}'
+                    )
+        return digital_object_uri
+
     def publish_transcripts(self):
         # publish transcript files to S3
         aws_cmd = sh.Command(config("WORK_AWS_CMD"))
@@ -514,27 +511,35 @@ class OralHistoriesService(rpyc.Service):
 
     def set_resolver_redirect(self, resolver_id, redirect_url):
         """Create or update a redirect entry in the S3 bucket."""
-        aws_cmd = sh.Command(config("WORK_AWS_CMD"))
+        try:
+            response = get_resolver_client().head_object(
+                Bucket=config("RESOLVER_BUCKET"), Key=resolver_id
+            )
+            if response.get("WebsiteRedirectLocation") == redirect_url:
+                logger.info(
+                    f'ℹ️  EXISTING RESOLVER REDIRECT FOUND: s3://{config("RESOLVER_BUCKET")}/{resolver_id} ➡️  {redirect_url}'
+                )
+                return
+        except botocore.exceptions.ClientError as error:
+            # NOTE without read permission on the bucket S3 answers 403 for
+            # every key, so the redirect is written as it was before the check
+            if error.response["Error"]["Code"] not in (
+                "403",
+                "404",
+                "AccessDenied",
+                "Forbidden",
+                "NoSuchKey",
+            ):
+                raise
+        get_resolver_client().put_object(
+            ACL="public-read",
+            Bucket=config("RESOLVER_BUCKET"),
+            Key=resolver_id,
+            WebsiteRedirectLocation=redirect_url,
+        )
         logger.info(
             f'☑️  RESOLVER REDIRECT SET: s3://{config("RESOLVER_BUCKET")}/{resolver_id} ➡️  {redirect_url}'
         )
-        # TODO reveal errors from the aws_cmd
-        return aws_cmd(
-            "s3api",
-            "put-object",
-            "--acl",
-            "public-read",
-            "--bucket",
-            config("RESOLVER_BUCKET"),
-            "--key",
-            resolver_id,
-            "--website-redirect-location",
-            redirect_url,
-            _env={
-                "AWS_ACCESS_KEY_ID": config("DISTILLERY_AWS_ACCESS_KEY_ID"),
-                "AWS_SECRET_ACCESS_KEY": config("DISTILLERY_AWS_SECRET_ACCESS_KEY"),
-            },
-        )
 
     def find_digital_object_component(self, digital_object_component_component_id):
         response = distillery.archivessnake_get(
@@ -549,50 +554,207 @@ class OralHistoriesService(rpyc.Service):
             )
         return response.json()["digital_object_components"][0]["ref"]
 
-    def update_markdown_metadata(self):
-        self.archival_object = distillery.find_archival_object(self.component_id)
-        self.metadata = self.create_metadata(archival_object=self.archival_object)
-        self.create_metadata_file()
+    def update_all_markdown_metadata(self, transcript_directories):
+        """Update transcripts concurrently."""
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=config("ORALHISTORIES_UPDATE_WORKERS", default=8, cast=int)
+        ) as executor:
+            futures = [
+                executor.submit(self.update_markdown_metadata, transcript_directory)
+                for transcript_directory in transcript_directories
+            ]
+            updated = [future.result() for future in futures].count(True)
+        logger.info(
+            f"☑️  MARKDOWN METADATA UPDATED: {updated} of {len(transcript_directories)} transcripts"
+        )
+
+    def update_markdown_metadata(self, transcript_directory):
+        """Replace the metadata of a transcript; return False if unchanged."""
+        component_id = transcript_directory.name
+        archival_object = distillery.find_archival_object(component_id)
+        metadata = self.create_metadata(archival_object=archival_object)
         # TODO account for _closed versions
-        pandoc_cmd = sh.Command(config("WORK_PANDOC_CMD"))
-        # create a fragment without metadata but with table of contents
-        pandoc_cmd(
-            "--from",
-            "markdown",
-            "--to",
-            "markdown",
-            f'--output={self.transcript_directory.joinpath(f"fragment.md")}',
-            self.transcript_directory.joinpath(f"{self.transcript_directory.name}.md"),
+        return replace_markdown_metadata(
+            transcript_directory.joinpath(f"{component_id}.md"), metadata
         )
-        # add updated metadata to markdown fragment
-        pandoc_cmd(
-            "--standalone",
-            f'--metadata-file={self.transcript_directory.joinpath("metadata.json")}',
-            "--from",
-            "markdown",
-            "--to",
-            "markdown",
-            f'--output={self.transcript_directory.joinpath(f"{self.transcript_directory.name}.md")}',
-            self.transcript_directory.joinpath(f"fragment.md"),
+
+
+# agent_uri: (expires, agent)
+agents = {}
+agents_lock = threading.Lock()
+
+
+def get_agent(agent_uri):
+    """Return agent data, fetching each agent at most once per TTL."""
+    with agents_lock:
+        expires, agent = agents.get(agent_uri, (0, None))
+    if expires > time.monotonic():
+        return agent
+    agent = distillery.archivessnake_get(agent_uri).json()
+    with agents_lock:
+        agents[agent_uri] = (
+            time.monotonic()
+            + config("ORALHISTORIES_AGENT_CACHE_TTL", default=300, cast=int),
+            agent,
         )
-        os.remove(self.transcript_directory.joinpath("metadata.json"))
-        os.remove(self.transcript_directory.joinpath("fragment.md"))
-        logger.info(
-            f'☑️  MARKDOWN METADATA UPDATED: {self.transcript_directory.joinpath(f"{self.transcript_directory.name}.md")}'
+    return agent
+
+
+def replace_markdown_metadata(markdown_file, metadata):
+    """Replace the YAML metadata block of a markdown file and keep the body.
+
+    Values are written as JSON, which is also valid YAML, so pandoc reads
+    them as it would from a --metadata-file.
+    """
+    # NOTE newline="" keeps the line endings of the file, like CRLF
+    with open(markdown_file, encoding="utf-8", newline="") as f:
+        markdown = f.read()
+    newline = "\r\n" if markdown.split("\n", 1)[0].endswith("\r") else "\n"
+    body = markdown
+    front_matter = re.match(
+        r"---\r?\n(?:.*?\r?\n)?(?:---|\.\.\.)\r?\n", markdown, re.DOTALL
+    )
+    if front_matter:
+        body = markdown[front_matter.end() :].lstrip("\r\n")
+    updated = "---{newline}{}---{newline}{newline}{}".format(
+        "".join(
+            f"{key}: {json.dumps(value, ensure_ascii=False)}{newline}"
+            for key, value in metadata.items()
+        ),
+        body,
+        newline=newline,
+    )
+    if updated == markdown:
+        logger.info(f"ℹ️  MARKDOWN METADATA UNCHANGED: {markdown_file}")
+        return False
+    with open(markdown_file, "w", encoding="utf-8", newline="") as f:
+        f.write(updated)
+    logger.info(f"☑️  MARKDOWN METADATA UPDATED: {markdown_file}")
+    return True
+
+
+def get_oralhistories_mirror():
+    return Path(
+        config(
+            "ORALHISTORIES_WORK_MIRROR",
+            default=Path(tempfile.gettempdir()).joinpath("oralhistories.git"),
+        )
+    )
+
+
+@contextlib.contextmanager
+def oralhistories_mirror_lock():
+    """Hold an exclusive lock on the mirror while its refs or worktrees change."""
+    with open(f"{get_oralhistories_mirror()}.lock", "w") as lockfile:
+        fcntl.flock(lockfile, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+
+def update_oralhistories_mirror():
+    """Clone the repository once and fetch it on later calls.
+
+    The mirror is a bare partial clone; file contents are only downloaded
+    when a worktree checks them out, and are kept for later jobs.
+    """
+    mirror = get_oralhistories_mirror()
+    git_cmd = sh.Command(config("WORK_GIT_CMD"))
+    ssh_command = f'ssh -i {config("ORALHISTORIES_GITHUB_SSH_KEY")}'
+    if not mirror.joinpath("HEAD").is_file():
+        # use a specific ssh identity_file when cloning this repository
+        git_cmd(
+            "clone",
+            "--bare",
+            "--filter=blob:none",
+            f'git@github.com:{config("ORALHISTORIES_GITHUB_REPO")}.git',
+            mirror,
+            _env={**os.environ, "GIT_SSH_COMMAND": ssh_command},
+        )
+        # set the ssh identity_file to use with this repository
+        git_cmd("-C", mirror, "config", "core.sshCommand", ssh_command)
+        # NOTE a bare clone has no fetch refspec; branches are updated in
+        # place because worktrees use a detached HEAD
+        git_cmd(
+            "-C", mirror, "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*"
+        )
+        logger.info(f"☑️  GIT REPOSITORY MIRRORED TO: {mirror}")
+    else:
+        git_cmd("-C", mirror, "fetch", "--prune", "--tags", "origin")
+        logger.info(f"☑️  GIT REPOSITORY MIRROR FETCHED: {mirror}")
+    # NOTE worktrees share this config, so the identity used for commits and
+    # rebases is only written here, while the caller holds the mirror lock
+    git_cmd(
+        "-C", mirror, "config", "user.email", config("ORALHISTORIES_GIT_USER_EMAIL")
+    )
+    git_cmd("-C", mirror, "config", "user.name", config("ORALHISTORIES_GIT_USER_NAME"))
+    return mirror
+
+
+def add_oralhistories_worktree(component_id=""):
+    """Return a new worktree of the main branch for the exclusive use of a job.
+
+    With a component_id only that transcript directory and the workflow
+    files are checked out.
+    """
+    git_cmd = sh.Command(config("WORK_GIT_CMD"))
+    worktree = tempfile.mkdtemp()
+    with oralhistories_mirror_lock():
+        mirror = update_oralhistories_mirror()
+        git_cmd(
+            "-C",
+            mirror,
+            "worktree",
+            "add",
+            "--detach",
+            "--no-checkout",
+            worktree,
+            "main",
         )
+        if component_id:
+            # NOTE the first sparse checkout turns on extensions.worktreeConfig
+            # in the shared mirror config, so it is set under the lock too
+            git_cmd(
+                "-C",
+                worktree,
+                "sparse-checkout",
+                "set",
+                f"transcripts/{component_id}",
+                ".github",
+            )
+    git_cmd("-C", worktree, "checkout", "--detach", "main")
+    logger.info(f"☑️  GIT WORKTREE ADDED: {worktree}")
+    return worktree
 
 
-class StatusFormatter(logging.Formatter):
-    def format(self, record):
-        """Output markdown status messages as HTML5."""
-        return markdown.markdown(
-            super().format(record),
-            output_format="html5",
-            extensions=[LinkAttrModifierExtension(new_tab="on")],
+def push_oralhistories_worktree(worktree, attempts=5):
+    """Push the worktree commits to main, rebasing when main has moved on."""
+    git_cmd = sh.Command(config("WORK_GIT_CMD"))
+    for attempt in range(1, attempts + 1):
+        try:
+            git_cmd("-C", worktree, "push", "origin", "HEAD:main")
+            return
+        except sh.ErrorReturnCode:
+            if attempt == attempts:
+                raise
+            logger.warning(f"⚠️  PUSH REJECTED; REBASING ONTO MAIN: {worktree}")
+            with oralhistories_mirror_lock():
+                update_oralhistories_mirror()
+            git_cmd("-C", worktree, "rebase", "main")
+
+
+def remove_oralhistories_worktree(worktree):
+    git_cmd = sh.Command(config("WORK_GIT_CMD"))
+    with oralhistories_mirror_lock():
+        git_cmd(
+            "-C", get_oralhistories_mirror(), "worktree", "remove", "--force", worktree
         )
+    logger.info(f"☑️  GIT WORKTREE REMOVED: {worktree}")
 
 
 if __name__ == "__main__":
     # fmt: off
     from rpyc.utils.server import ThreadedServer
+    distillery.configure_logging()
     ThreadedServer(OralHistoriesService, port=config("ORALHISTORIES_RPYC_PORT")).start()
@@ -1,30 +1,108 @@
+import argparse
+import concurrent.futures
+import hashlib
+import json
 import os
 import subprocess
-import sys
 
+# identifier: digest of the inputs of the last successful build
+MANIFEST = "build-manifest.json"
+TEMPLATES = ".github/workflows/templates"
 
-def main(file):
-    print(f"🐞 file: {file}")
-    if not os.path.exists(file):
-        return
-    # TODO think through handling of _closed files
-    if file.startswith("transcripts/"):
+
+def main(files, workers=None, force=False):
+    identifiers = set()
+    for file in files:
+        print(f"🐞 file: {file}")
+        # TODO think through handling of _closed files
+        if not file.startswith("transcripts/"):
+            continue
         # file_segments[1] will be component_id
         file_segments = file.split("/")
-        # skip when build artifacts already exist
-        if os.path.isfile(f"build/{file_segments[1]}/index.html"):
-            print(f"🐞 file exists: build/{file_segments[1]}/index.html")
-            return
-        # remove published files when markdown transcript is deleted
-        if file.endswith(".md") and not os.path.isfile(file):
-            print(f"🐞 file deleted: {file}")
-            os.remove(f"index.html")
-            os.remove(f"{os.path.splitext(file)[0]}.pdf")
-            return
-        generate_files(file_segments[1])
-
-
-def generate_files(identifier):
+        if len(file_segments) < 3:
+            continue
+        if not os.path.isfile(f"transcripts/{file_segments[1]}/{file_segments[1]}.md"):
+            print(f"🐞 no markdown transcript: {file_segments[1]}")
+            continue
+        identifiers.add(file_segments[1])
+    build_all(sorted(identifiers), workers, force)
+
+
+def build_all(identifiers, workers=None, force=False):
+    """Generate files for identifiers whose inputs changed since the last build."""
+    manifest = load_manifest()
+    digests = {identifier: get_inputs_digest(identifier) for identifier in identifiers}
+    if not force:
+        for identifier in identifiers:
+            # skip when the recorded build used the same inputs
+            if manifest.get(identifier) == digests[identifier] and os.path.isfile(
+                f"transcripts/{identifier}/index.html"
+            ):
+                print(f"🐞 inputs unchanged: {identifier}")
+                del digests[identifier]
+    workers = workers or os.cpu_count()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        built = run_stage(executor, prepare_files, list(digests))
+        built = render_pdfs(executor, built, workers)
+        built = run_stage(executor, finish_files, built)
+    for identifier in built:
+        manifest[identifier] = digests[identifier]
+    save_manifest(manifest)
+
+
+def get_inputs_digest(identifier):
+    """Hash the markdown, assets and templates used to build an identifier."""
+    digest = hashlib.sha256()
+    inputs = [
+        os.path.join(directory, filename)
+        for directory, _, filenames in os.walk(f"transcripts/{identifier}")
+        for filename in filenames
+        # NOTE generated files are not inputs
+        if not filename.endswith((".html", ".pdf"))
+    ] + [
+        os.path.join(directory, filename)
+        for directory, _, filenames in os.walk(TEMPLATES)
+        for filename in filenames
+    ]
+    for filepath in sorted(inputs):
+        with open(filepath, "rb") as f:
+            digest.update(filepath.encode())
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest):
+    with open(MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def run_stage(executor, function, identifiers):
+    """Call function for each identifier and return those that succeeded."""
+    futures = {
+        identifier: executor.submit(function, identifier) for identifier in identifiers
+    }
+    succeeded = []
+    for identifier, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            # NOTE a failed build is retried on the next run
+            print(f"❌ build failed: {identifier}: {e}")
+            continue
+        succeeded.append(identifier)
+    return succeeded
+
+
+def prepare_files(identifier):
     os.makedirs(f"build/{identifier}", exist_ok=True)
     # copy assets for build
     subprocess.run(
@@ -39,7 +117,8 @@ def generate_files(identifier):
             "*.pdf",
             f"transcripts/{identifier}/",
             f"build/{identifier}/",
-        ]
+        ],
+        check=True,
     )
     # create intermediate html for pagedjs
     subprocess.run(
@@ -50,12 +129,61 @@ def generate_files(identifier):
             "--table-of-contents",
             "--from=markdown",
             "--to=html",
-            "--template=.github/workflows/templates/pdf.html",
+            f"--template={TEMPLATES}/pdf.html",
             f"--output=build/{identifier}/tmp.html",
             f"transcripts/{identifier}/{identifier}.md",
-        ]
+        ],
+        check=True,
     )
     print(f"🐞 file generated: build/{identifier}/tmp.html")
+
+
+def render_pdfs(executor, identifiers, workers):
+    """Render the intermediate html to pdf, reusing one browser for all of them.
+
+    Identifiers the warm browser did not render fall back to a pagedjs-cli
+    process of their own.
+    """
+    if identifiers:
+        try:
+            subprocess.run(
+                [
+                    "node",
+                    os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf.mjs"),
+                    f"--concurrency={workers}",
+                ]
+                + [
+                    path
+                    for identifier in identifiers
+                    for path in (
+                        f"build/{identifier}/tmp.html",
+                        f"build/{identifier}/tmp.pdf",
+                    )
+                ],
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"⚠️  warm browser rendering incomplete: {e}")
+    rendered = [
+        identifier
+        for identifier in identifiers
+        if os.path.isfile(f"build/{identifier}/tmp.pdf")
+    ]
+    for identifier in rendered:
+        os.replace(
+            f"build/{identifier}/tmp.pdf", f"transcripts/{identifier}/{identifier}.pdf"
+        )
+        print(f"🐞 file generated: transcripts/{identifier}/{identifier}.pdf")
+        os.remove(f"build/{identifier}/tmp.html")
+        print(f"🐞 file deleted: build/{identifier}/tmp.html")
+    return rendered + run_stage(
+        executor,
+        render_pdf,
+        [identifier for identifier in identifiers if identifier not in rendered],
+    )
+
+
+def render_pdf(identifier):
     # create pdf with pagedjs
     subprocess.run(
         [
@@ -63,11 +191,15 @@ def generate_files(identifier):
             f"build/{identifier}/tmp.html",
             "--output",
             f"transcripts/{identifier}/{identifier}.pdf",
-        ]
+        ],
+        check=True,
     )
     print(f"🐞 file generated: build/{identifier}/{identifier}.pdf")
     os.remove(f"build/{identifier}/tmp.html")
     print(f"🐞 file deleted: build/{identifier}/tmp.html")
+
+
+def finish_files(identifier):
     # generate html
     subprocess.run(
         [
@@ -77,7 +209,7 @@ def generate_files(identifier):
             "--table-of-contents",
             "--from=markdown",
             "--to=html",
-            "--template=.github/workflows/templates/web.html",
+            f"--template={TEMPLATES}/web.html",
             "--variable=pdf-size:{}".format(
                 round(
                     os.path.getsize(f"transcripts/{identifier}/{identifier}.pdf")
@@ -87,10 +219,21 @@ def generate_files(identifier):
             ),
             f"--output=build/{identifier}/index.html",
             f"transcripts/{identifier}/{identifier}.md",
-        ]
+        ],
+        check=True,
     )
     print(f"🐞 file generated: build/{identifier}/index.html")
 
 
 if __name__ == "__main__":
-    main(sys.argv[1])
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.environ.get("GENERATE_WORKERS"),
+        help="number of identifiers built at the same time; defaults to cpu count",
+    )
+    parser.add_argument("--force", action="store_true", help="ignore the manifest")
+    args = parser.parse_args()
+    main(args.files, args.workers, args.force)
@@ -0,0 +1,69 @@
+// render many pagedjs documents to pdf with one headless browser
+//
+// usage: node pdf.mjs [--concurrency=N] input.html output.pdf [input.html output.pdf ...]
+//
+// each document is rendered in its own tab; a failed document is reported
+// and the exit code is nonzero, leaving the caller to retry it another way
+
+import { execSync } from "node:child_process";
+import { readFile, writeFile } from "node:fs/promises";
+import path from "node:path";
+import { pathToFileURL } from "node:url";
+
+const args = process.argv.slice(2);
+let concurrency = 1;
+if (args.length && args[0].startsWith("--concurrency=")) {
+  concurrency = Number(args.shift().split("=")[1]) || 1;
+}
+const documents = [];
+for (let i = 0; i + 1 < args.length; i += 2) {
+  documents.push({ input: path.resolve(args[i]), output: path.resolve(args[i + 1]) });
+}
+
+// the Printer options and properties used here are internal to pagedjs-cli;
+// the workflows install this version, and any other is left to the caller
+const SUPPORTED_VERSION = "0.4.3";
+
+// NOTE pagedjs-cli is installed globally, where import() does not look
+const root =
+  process.env.PAGEDJS_CLI_ROOT ||
+  path.join(execSync("npm root -g").toString().trim(), "pagedjs-cli");
+const { version } = JSON.parse(await readFile(path.join(root, "package.json")));
+if (version !== SUPPORTED_VERSION) {
+  console.error(`❌ unsupported pagedjs-cli version: ${version} (expected ${SUPPORTED_VERSION})`);
+  process.exit(1);
+}
+const { default: Printer } = await import(
+  pathToFileURL(path.join(root, "src", "printer.js")).href
+);
+
+const printer = new Printer({ closeAfter: false });
+// launch the browser before the tabs share it
+if (typeof printer.setup === "function" && !printer.browser) {
+  await printer.setup();
+}
+
+let failed = 0;
+async function render() {
+  while (documents.length) {
+    const document = documents.shift();
+    try {
+      const started = Date.now();
+      const pdf = await printer.pdf(document.input);
+      await writeFile(document.output, pdf);
+      console.log(`🐞 file generated: ${document.output} (${Date.now() - started}ms)`);
+    } catch (error) {
+      failed += 1;
+      console.error(`❌ pdf failed: ${document.input}: ${error}`);
+    }
+  }
+}
+
+try {
+  await Promise.all(Array.from({ length: concurrency }, render));
+} finally {
+  if (printer.browser) {
+    await printer.browser.close();
+  }
+}
+process.exit(failed ? 1 : 0);
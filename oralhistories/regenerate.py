@@ -7,7 +7,8 @@ import generate
 def main(identifier):
     print(f"🐞 identifier: {identifier}")
     if os.path.isfile(f"transcripts/{identifier}/{identifier}.md"):
-        generate.generate_files(identifier)
+        # rebuild even when the inputs are unchanged
+        generate.build_all([identifier], force=True)
 
 
 if __name__ == "__main__":
@@ -11,23 +11,20 @@ from pathlib import Path
 import boto3
 import botocore
 
-from decouple import config
-
 import distillery
+import settings
 
-logging.config.fileConfig(
-    # set the logging configuration in the settings.ini file
-    Path(__file__).resolve().parent.joinpath("settings.ini"),
-    disable_existing_loggers=False,
-)
 logger = logging.getLogger("s3")
 
-s3_client = boto3.client(
-    "s3",
-    region_name=config("DISTILLERY_AWS_REGION", default="us-west-2"),
-    aws_access_key_id=config("DISTILLERY_AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=config("DISTILLERY_AWS_SECRET_ACCESS_KEY"),
-)
+
+@distillery.per_process
+def get_s3_client():
+    return boto3.client(
+        "s3",
+        region_name=settings.get_settings().distillery_aws_region,
+        aws_access_key_id=settings.get_settings().distillery_aws_access_key_id,
+        aws_secret_access_key=settings.get_settings().distillery_aws_secret_access_key,
+    )
 
 
 def collection_level_preprocessing(collection_id, work_preservation_files):
@@ -42,13 +39,13 @@ def transfer_collection_datafile(collection_id, work_preservation_files):
         Path(work_preservation_files).joinpath(collection_datafile_key).resolve()
     )
     with open(collection_datafile_path, "rb") as body:
-        s3_client.put_object(
-            Bucket=config("PRESERVATION_BUCKET"),
+        get_s3_client().put_object(
+            Bucket=settings.get_settings().preservation_bucket,
             Key=str(collection_datafile_key),
             Body=body,
         )
     logger.info(
-        f'☑️  COLLECTION DATAFILE UPLOADED TO S3: {config("PRESERVATION_BUCKET")}/{str(collection_datafile_key)}'
+        f"☑️  COLLECTION DATAFILE UPLOADED TO S3: {settings.get_settings().preservation_bucket}/{str(collection_datafile_key)}"
     )
 
 
@@ -57,16 +54,16 @@ def transfer_archival_object_datafile(variables):
     # logger.info(f'🐞 str(variables["current_archival_object_datafile"]): {str(variables["current_archival_object_datafile"])}')
     archival_object_datafile_key = str(
         variables["current_archival_object_datafile"]
-    ).split(f'{config("WORK_PRESERVATION_FILES")}/')[-1]
+    ).split(f"{settings.get_settings().work_preservation_files}/")[-1]
     # logger.info(f'🐞 archival_object_datafile_key: {archival_object_datafile_key}')
     with open(variables["current_archival_object_datafile"], "rb") as body:
-        s3_client.put_object(
-            Bucket=config("PRESERVATION_BUCKET"),
+        get_s3_client().put_object(
+            Bucket=settings.get_settings().preservation_bucket,
             Key=archival_object_datafile_key,
             Body=body,
         )
     logger.info(
-        f'☑️  ARCHIVAL OBJECT DATAFILE UPLOADED TO S3: {config("PRESERVATION_BUCKET")}/{str(archival_object_datafile_key)}'
+        f"☑️  ARCHIVAL OBJECT DATAFILE UPLOADED TO S3: {settings.get_settings().preservation_bucket}/{str(archival_object_datafile_key)}"
     )
 
 
@@ -91,11 +88,11 @@ def transfer_digital_object_component_file(variables):
         "ETag": "\"614bccea2760f37f41be65c62c41d66e\""
     }"""
     preservation_file_key = str(variables["preservation_file_info"]["filepath"])[
-        len(f'{config("WORK_PRESERVATION_FILES")}/') :
+        len(f"{settings.get_settings().work_preservation_files}/") :
     ]
     with open(variables["preservation_file_info"]["filepath"], "rb") as body:
-        response = s3_client.put_object(
-            Bucket=config("PRESERVATION_BUCKET"),
+        response = get_s3_client().put_object(
+            Bucket=settings.get_settings().preservation_bucket,
             Key=preservation_file_key,
             Body=body,
             ContentMD5=base64.b64encode(
@@ -110,7 +107,7 @@ def transfer_digital_object_component_file(variables):
         return
     else:
         logger.info(
-            f'☑️  DIGITAL OBJECT COMPONENT FILE UPLOADED TO S3: {config("PRESERVATION_BUCKET")}/{preservation_file_key}'
+            f"☑️  DIGITAL OBJECT COMPONENT FILE UPLOADED TO S3: {settings.get_settings().preservation_bucket}/{preservation_file_key}"
         )
         return response["ETag"].strip('"')
 
@@ -125,7 +122,7 @@ def process_digital_object_component_file(variables):
         logger.warning()
         return
     variables["file_uri_scheme"] = "s3"
-    variables["file_uri_host"] = config("PRESERVATION_BUCKET")
+    variables["file_uri_host"] = settings.get_settings().preservation_bucket
     if not distillery.save_digital_object_component_record(variables):
         logger.warning()
         return
@@ -133,14 +130,18 @@ def process_digital_object_component_file(variables):
 
 def validate_connection():
     try:
-        response = s3_client.put_object(
-            Bucket=config("PRESERVATION_BUCKET"), Key=".distillery"
+        response = get_s3_client().put_object(
+            Bucket=settings.get_settings().preservation_bucket, Key=".distillery"
         )
         if response["ResponseMetadata"]["HTTPStatusCode"] == 200:
-            logger.info(f'☁️  S3 BUCKET WRITABLE: {config("PRESERVATION_BUCKET")}')
+            logger.info(
+                f"☁️  S3 BUCKET WRITABLE: {settings.get_settings().preservation_bucket}"
+            )
             return True
         else:
-            logger.error(f'❌ S3 BUCKET NOT WRITABLE: {config("PRESERVATION_BUCKET")}')
+            logger.error(
+                f"❌ S3 BUCKET NOT WRITABLE: {settings.get_settings().preservation_bucket}"
+            )
             logger.error(f"❌ S3 BUCKET RESPONSE: {response}")
             return False
     except botocore.exceptions.ClientError as error:
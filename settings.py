@@ -0,0 +1,237 @@
+# CALTECH ARCHIVES AND SPECIAL COLLECTIONS
+# digital object preservation workflow
+
+# settings read by the processing pipeline, loaded once per process
+
+import dataclasses
+import functools
+import importlib.util
+import shutil
+
+from pathlib import Path
+
+from decouple import config
+
+
+@dataclasses.dataclass(frozen=True)
+class Settings:
+    """Values from settings.ini; URLs have no trailing slash."""
+
+    aspace_api_url: str
+    aspace_username: str
+    aspace_password: str
+    aspace_staff_url: str
+    aspace_public_url: str
+    work_log_files: str
+    work_job_database: str
+    initial_original_files: str
+    batch_sets_directory: str
+    work_preservation_files: str
+    work_stillage_files: str
+    onsite_medium: str
+    cloud_platform: str
+    access_platform: str
+    distillery_aws_access_key_id: str
+    distillery_aws_secret_access_key: str
+    distillery_aws_region: str
+    preservation_bucket: str
+    alchemist_base_url: str
+    alchemist_bucket: str
+    alchemist_url_prefix: str
+    alchemist_iiif_endpoint: str
+    alchemist_cloudfront_distribution_id: str
+    alchemist_list_workers: int
+    alchemist_publish_workers: int
+    alchemist_regenerate_fetch_workers: int
+    alchemist_regenerate_render_workers: int
+    alchemist_regenerate_publish_workers: int
+    alchemist_regenerate_index: str
+    alchemist_invalidation_delay: float
+    alchemist_invalidation_max_paths: int
+    alchemist_job_limit: int
+    tape_ssh_user: str
+    tape_ssh_host: str
+    tape_ssh_port: str
+    tape_ssh_authorized_key: str
+    tape_python3_cmd: str
+    tape_lto_mountpoint: str
+    tape_rsync_cmd: str
+    tape_ltfs_cmd: str
+    tape_nas_mount_cmd: str
+    tape_nas_user: str
+    tape_nas_pass: str
+    tape_container_profile_uri: str
+    tape_nas_archives_mountpoint: str
+    tape_preservation_files: str
+    nas_ip_address: str
+    nas_share: str
+    work_ffmpeg_cmd: str
+    work_ffprobe_cmd: str
+    work_magick_cmd: str
+    work_rsync_cmd: str
+    work_vips_cmd: str
+    work_ionice_cmd: str
+
+    def validate(self):
+        """Return a list of problems with the settings the pipeline uses.
+
+        NOTE only the platforms that are configured are checked
+        """
+        problems = []
+
+        def require(*names):
+            for name in names:
+                if not getattr(self, name.lower()):
+                    problems.append(f"{name} is not set")
+
+        def require_url(*names):
+            for name in names:
+                if not getattr(self, name.lower()).startswith(("http://", "https://")):
+                    problems.append(f"{name} is not an http(s) URL")
+
+        require(
+            "ASPACE_USERNAME",
+            "ASPACE_PASSWORD",
+            "WORK_LOG_FILES",
+            "INITIAL_ORIGINAL_FILES",
+            "BATCH_SETS_DIRECTORY",
+        )
+        require_url("ASPACE_API_URL", "ASPACE_STAFF_URL")
+        if not Path(self.work_job_database).parent.is_dir():
+            problems.append(
+                f"WORK_JOB_DATABASE directory not found: {self.work_job_database}"
+            )
+        if self.alchemist_job_limit < 1:
+            problems.append("ALCHEMIST_JOB_LIMIT is less than 1")
+        for name in ["ONSITE_MEDIUM", "CLOUD_PLATFORM", "ACCESS_PLATFORM"]:
+            module = getattr(self, name.lower())
+            if module and not importlib.util.find_spec(module):
+                problems.append(f"{name} module not found: {module}")
+        if self.onsite_medium or self.cloud_platform:
+            require("WORK_PRESERVATION_FILES")
+        if self.onsite_medium == "tape":
+            require(
+                "TAPE_SSH_USER",
+                "TAPE_SSH_HOST",
+                "TAPE_SSH_PORT",
+                "TAPE_SSH_AUTHORIZED_KEY",
+                "TAPE_LTO_MOUNTPOINT",
+                "TAPE_PRESERVATION_FILES",
+            )
+        if self.cloud_platform == "s3" or self.access_platform == "alchemist":
+            require("DISTILLERY_AWS_ACCESS_KEY_ID", "DISTILLERY_AWS_SECRET_ACCESS_KEY")
+        if self.cloud_platform == "s3":
+            require("PRESERVATION_BUCKET")
+        if self.access_platform == "alchemist":
+            # NOTE ALCHEMIST_CLOUDFRONT_DISTRIBUTION_ID is optional; without
+            # it no invalidations are created
+            require("ALCHEMIST_BUCKET", "ALCHEMIST_URL_PREFIX")
+            require_url(
+                "ASPACE_PUBLIC_URL", "ALCHEMIST_BASE_URL", "ALCHEMIST_IIIF_ENDPOINT"
+            )
+            if self.alchemist_url_prefix.strip("/") != self.alchemist_url_prefix:
+                problems.append("ALCHEMIST_URL_PREFIX has a leading or trailing slash")
+        return problems
+
+
+@functools.cache
+def get_settings():
+    """Return the settings; they are not validated here."""
+    return Settings(
+        aspace_api_url=config("ASPACE_API_URL", default=""),
+        aspace_username=config("ASPACE_USERNAME", default=""),
+        aspace_password=config("ASPACE_PASSWORD", default=""),
+        aspace_staff_url=config("ASPACE_STAFF_URL", default="").rstrip("/"),
+        aspace_public_url=config("ASPACE_PUBLIC_URL", default="").rstrip("/"),
+        work_log_files=config("WORK_LOG_FILES", default=""),
+        # NOTE kept with the logs by default
+        work_job_database=config("WORK_JOB_DATABASE", default="")
+        or Path(config("WORK_LOG_FILES", default="."))
+        .joinpath("distillery_jobs.sqlite3")
+        .as_posix(),
+        initial_original_files=config("INITIAL_ORIGINAL_FILES", default=""),
+        batch_sets_directory=config("BATCH_SETS_DIRECTORY", default=""),
+        work_preservation_files=config("WORK_PRESERVATION_FILES", default=""),
+        # NOTE a .STILLAGE directory next to WORK_PRESERVATION_FILES by default
+        work_stillage_files=config("WORK_STILLAGE_FILES", default="")
+        or Path(config("WORK_PRESERVATION_FILES", default="."))
+        .parent.joinpath(".STILLAGE")
+        .as_posix(),
+        onsite_medium=config("ONSITE_MEDIUM", default=""),
+        cloud_platform=config("CLOUD_PLATFORM", default=""),
+        access_platform=config("ACCESS_PLATFORM", default=""),
+        distillery_aws_access_key_id=config("DISTILLERY_AWS_ACCESS_KEY_ID", default=""),
+        distillery_aws_secret_access_key=config(
+            "DISTILLERY_AWS_SECRET_ACCESS_KEY", default=""
+        ),
+        distillery_aws_region=config("DISTILLERY_AWS_REGION", default="us-west-2"),
+        preservation_bucket=config("PRESERVATION_BUCKET", default=""),
+        alchemist_base_url=config("ALCHEMIST_BASE_URL", default="").rstrip("/"),
+        alchemist_bucket=config("ALCHEMIST_BUCKET", default=""),
+        alchemist_url_prefix=config("ALCHEMIST_URL_PREFIX", default=""),
+        alchemist_iiif_endpoint=config("ALCHEMIST_IIIF_ENDPOINT", default="").rstrip(
+            "/"
+        ),
+        alchemist_cloudfront_distribution_id=config(
+            "ALCHEMIST_CLOUDFRONT_DISTRIBUTION_ID", default=""
+        ),
+        alchemist_list_workers=config("ALCHEMIST_LIST_WORKERS", default=8, cast=int),
+        alchemist_publish_workers=config(
+            "ALCHEMIST_PUBLISH_WORKERS", default=16, cast=int
+        ),
+        alchemist_regenerate_fetch_workers=config(
+            "ALCHEMIST_REGENERATE_FETCH_WORKERS", default=4, cast=int
+        ),
+        alchemist_regenerate_render_workers=config(
+            "ALCHEMIST_REGENERATE_RENDER_WORKERS", default=4, cast=int
+        ),
+        alchemist_regenerate_publish_workers=config(
+            "ALCHEMIST_REGENERATE_PUBLISH_WORKERS", default=4, cast=int
+        ),
+        # NOTE kept with the logs by default
+        alchemist_regenerate_index=config("ALCHEMIST_REGENERATE_INDEX", default="")
+        or Path(config("WORK_LOG_FILES", default="."))
+        .joinpath("alchemist_regenerate_index.json")
+        .as_posix(),
+        alchemist_invalidation_delay=config(
+            "ALCHEMIST_INVALIDATION_DELAY", default=5, cast=float
+        ),
+        alchemist_invalidation_max_paths=config(
+            "ALCHEMIST_INVALIDATION_MAX_PATHS", default=15, cast=int
+        ),
+        alchemist_job_limit=config("ALCHEMIST_JOB_LIMIT", default=1, cast=int),
+        tape_ssh_user=config("TAPE_SSH_USER", default=""),
+        tape_ssh_host=config("TAPE_SSH_HOST", default=""),
+        tape_ssh_port=config("TAPE_SSH_PORT", default=""),
+        tape_ssh_authorized_key=config("TAPE_SSH_AUTHORIZED_KEY", default=""),
+        tape_python3_cmd=config("TAPE_PYTHON3_CMD", default=""),
+        tape_lto_mountpoint=config("TAPE_LTO_MOUNTPOINT", default=""),
+        tape_rsync_cmd=config("TAPE_RSYNC_CMD", default=""),
+        tape_ltfs_cmd=config("TAPE_LTFS_CMD", default=""),
+        tape_nas_mount_cmd=config("TAPE_NAS_MOUNT_CMD", default=""),
+        tape_nas_user=config("TAPE_NAS_USER", default=""),
+        tape_nas_pass=config("TAPE_NAS_PASS", default=""),
+        tape_container_profile_uri=config("TAPE_CONTAINER_PROFILE_URI", default=""),
+        tape_nas_archives_mountpoint=config("TAPE_NAS_ARCHIVES_MOUNTPOINT", default=""),
+        tape_preservation_files=config("TAPE_PRESERVATION_FILES", default=""),
+        nas_ip_address=config("NAS_IP_ADDRESS", default=""),
+        nas_share=config("NAS_SHARE", default=""),
+        work_ffmpeg_cmd=config("WORK_FFMPEG_CMD", default="ffmpeg"),
+        work_ffprobe_cmd=config("WORK_FFPROBE_CMD", default="ffprobe"),
+        work_magick_cmd=config("WORK_MAGICK_CMD", default="magick"),
+        work_rsync_cmd=config("WORK_RSYNC_CMD", default=""),
+        work_vips_cmd=config("WORK_VIPS_CMD", default="vips"),
+        # NOTE no I/O priority is set where ionice is not installed
+        work_ionice_cmd=config("WORK_IONICE_CMD", default=shutil.which("ionice") or ""),
+    )
+
+
+def check_settings():
+    """Raise a ValueError if any setting the pipeline uses is invalid.
+
+    NOTE call at DISTILLERY service startup so invalid settings stop the
+    service before any job runs
+    """
+    problems = get_settings().validate()
+    if problems:
+        raise ValueError(f'❌ INVALID SETTINGS: {"; ".join(problems)}')
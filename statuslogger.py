@@ -1,4 +1,9 @@
+import json
 import logging
+import re
+import threading
+
+from pathlib import Path
 
 import markdown  # pypi: markdown
 
@@ -7,11 +12,152 @@ from markdown_link_attr_modifier import (
 )  # pypi: markdown-link-attr-modifier
 
 
+# a message that starts with no block markup and contains no inline markup,
+# escapes or HTML renders as a single paragraph of the text itself
+PLAIN_MESSAGE = re.compile(r"[^\s\\`*_\[\]!<>&#\-+=\d.][^\\`*_\[\]!<>&\n\t\r]*\Z")
+
+
 class StatusFormatter(logging.Formatter):
+    """Output markdown status messages as HTML5.
+
+    Each thread reuses one Markdown instance, which is reset between records,
+    and messages without markup skip Markdown entirely.
+    """
+
+    renderers = threading.local()
+
     def format(self, record):
-        """Output markdown status messages as HTML5."""
-        return markdown.markdown(
-            super().format(record),
-            output_format="html5",
-            extensions=[LinkAttrModifierExtension(new_tab="on")],
-        )
+        message = super().format(record)
+        if PLAIN_MESSAGE.match(message):
+            return f"<p>{message}</p>"
+        if not hasattr(self.renderers, "markdown"):
+            self.renderers.markdown = markdown.Markdown(
+                output_format="html5",
+                extensions=[LinkAttrModifierExtension(new_tab="on")],
+            )
+        return self.renderers.markdown.reset().convert(message)
+
+
+class EventFormatter(logging.Formatter):
+    """Output status records as JSON objects for the event log.
+
+    Optional fields come from the extra argument of the logging call, for
+    example extra={"event": "published", "archival_object": component_id}.
+    The state is that of the whole job so far: running until a message
+    containing ❌ marks it failed or 🏁/🈺 marks it succeeded.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.state = "running"
+
+    def format(self, record):
+        message = record.getMessage()
+        if self.state == "running":
+            if "❌" in message:
+                self.state = "failed"
+            elif message.strip() in ["🏁", "🈺"]:
+                self.state = "succeeded"
+        event = {
+            "time": record.created,
+            "event": getattr(record, "event", "status"),
+            "message": message,
+            "state": self.state,
+        }
+        for field in ["archival_object", "stage", "bytes", "duration"]:
+            if hasattr(record, field):
+                event[field] = getattr(record, field)
+        if record.exc_info:
+            event["error"] = self.formatException(record.exc_info)
+        elif hasattr(record, "error"):
+            event["error"] = str(record.error)
+        elif record.levelno >= logging.ERROR:
+            event["error"] = message
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def get_event_logfile(logfile):
+    """Return the JSON-lines event log that accompanies a status log."""
+    return Path(logfile).with_suffix(".jsonl")
+
+
+def archive_status_log(logfile):
+    """Move the status and event logs of an earlier attempt to numbered names.
+
+    NOTE a job whose event log does not exist yet is reported as queued, so
+    the state of the earlier attempt is not shown for the next one
+    """
+    logfile = Path(logfile)
+    attempt = 1
+    while logfile.with_suffix(f".{attempt}{logfile.suffix}").exists():
+        attempt += 1
+    for path in [logfile, get_event_logfile(logfile)]:
+        if path.exists():
+            path.rename(path.with_suffix(f".{attempt}{path.suffix}"))
+
+
+def create_status_logger(logfile):
+    """Return a logger that writes status messages for one job to its log file.
+
+    The logger is not registered with the logging module, so jobs running at
+    the same time in one process never share or replace each other's handlers.
+    Every message is also written as an event to the JSON-lines event log.
+    """
+    Path(logfile).touch()
+    status_logger = logging.Logger(f"status:{logfile}", logging.INFO)
+    status_handler = logging.FileHandler(logfile, encoding="utf-8")
+    status_handler.setLevel(logging.INFO)
+    status_handler.setFormatter(StatusFormatter("%(message)s"))
+    status_logger.addHandler(status_handler)
+    event_handler = logging.FileHandler(get_event_logfile(logfile), encoding="utf-8")
+    event_handler.setLevel(logging.INFO)
+    event_handler.setFormatter(EventFormatter())
+    status_logger.addHandler(event_handler)
+    return status_logger
+
+
+def close_status_logger(status_logger):
+    # NOTE background work that outlives the job, like CloudFront
+    # invalidations, must not write after the job's final message
+    status_logger.disabled = True
+    for status_handler in status_logger.handlers[:]:
+        status_logger.removeHandler(status_handler)
+        status_handler.close()
+
+
+if __name__ == "__main__":
+    # benchmark formatting of typical status messages
+    import timeit
+
+    messages = [
+        "🟢 BEGIN DISTILLING",
+        "☑️  DESTINATIONS: cloud, onsite, access",
+        "☑️  ARCHIVAL OBJECT FOUND: [**Item Title**](https://aspace.example.org/resolve/readonly?uri=/repositories/2/archival_objects/1)",
+        "☑️  ORIGINAL FILE COPIED: HaleGE/HaleGE_02_0B_056_07_0001/HaleGE_02_0B_056_07_0001.tif",
+        "📄 HaleGE_02_0B_056_07_0001.tif",
+        "❌ SOMETHING WENT WRONG",
+        "🏁",
+    ]
+    records = [
+        logging.LogRecord("status", logging.INFO, __file__, 0, message, None, None)
+        for message in messages
+    ]
+
+    def format_with_markdown_function():
+        for record in records:
+            markdown.markdown(
+                record.getMessage(),
+                output_format="html5",
+                extensions=[LinkAttrModifierExtension(new_tab="on")],
+            )
+
+    formatter = StatusFormatter("%(message)s")
+
+    def format_with_status_formatter():
+        for record in records:
+            formatter.format(record)
+
+    number = 1000
+    for benchmark in [format_with_markdown_function, format_with_status_formatter]:
+        seconds = min(timeit.repeat(benchmark, number=number, repeat=3))
+        print(f"{benchmark.__name__}: {number * len(records) / seconds:,.0f} records/s")
@@ -8,15 +8,9 @@ from datetime import date
 from pathlib import Path
 
 import sh
-from decouple import config
-
 import distillery
+import settings
 
-logging.config.fileConfig(
-    # set the logging configuration in the settings.ini file
-    Path(__file__).resolve().parent.joinpath("settings.ini"),
-    disable_existing_loggers=False,
-)
 logger = logging.getLogger("tape")
 
 
@@ -26,10 +20,10 @@ tape_server = sh.ssh.bake(
     "-o",
     "IdentitiesOnly=yes",
     "-i",
-    f'{config("TAPE_SSH_AUTHORIZED_KEY")}',
+    f"{settings.get_settings().tape_ssh_authorized_key}",
     "-p",
-    f"{config('TAPE_SSH_PORT')}",
-    f"{config('TAPE_SSH_USER')}@{config('TAPE_SSH_HOST')}",
+    f"{settings.get_settings().tape_ssh_port}",
+    f"{settings.get_settings().tape_ssh_user}@{settings.get_settings().tape_ssh_host}",
 )
 
 
@@ -56,7 +50,7 @@ def collection_level_preprocessing(collection_id, work_preservation_files):
 def transfer_archival_object_derivative_files(variables):
     # Calculate whether the current directory will fit on the mounted tape.
     archival_object_directory_bytes = distillery.get_directory_bytes(
-        Path(config("TAPE_PRESERVATION_FILES"))
+        Path(settings.get_settings().tape_preservation_files)
         .joinpath(
             distillery.get_archival_object_directory_prefix(
                 variables["arrangement"], variables["archival_object"]
@@ -71,7 +65,7 @@ def transfer_archival_object_derivative_files(variables):
     # NOTE output from tape_server connection is a string formatted like:
     # `5732142415872 5690046283776`
     tape_bytes = tape_server(
-        f'{config("TAPE_PYTHON3_CMD")} -c \'import shutil; total, used, free = shutil.disk_usage("{config("TAPE_LTO_MOUNTPOINT")}"); print(total, free)\''
+        f"{settings.get_settings().tape_python3_cmd} -c 'import shutil; total, used, free = shutil.disk_usage(\"{settings.get_settings().tape_lto_mountpoint}\"); print(total, free)'"
     ).strip()
     # convert the string to a tuple and get the parts
     tape_total_bytes = tuple(map(int, tape_bytes.split(" ")))[0]
@@ -129,7 +123,7 @@ def establish_tape_top_container_uri(variables):
         # indicator is required
         top_container["indicator"] = variables["tape_indicator"]
         top_container["container_profile"] = {
-            "ref": config("TAPE_CONTAINER_PROFILE_URI")
+            "ref": settings.get_settings().tape_container_profile_uri
         }
         top_container["type"] = "Tape"
         # create via post
@@ -199,11 +193,11 @@ def rsync_archival_object_directory_to_tape(variables):
         # NOTE running with `_bg=True` and `_out` to process each line of output
         logger.info("⏳ PERFORMING RSYNC TO TAPE...")
         rsync_process = tape_server(
-            config("TAPE_RSYNC_CMD"),
+            settings.get_settings().tape_rsync_cmd,
             "-rv",
             "--exclude=.DS_Store",
-            f'{config("TAPE_PRESERVATION_FILES")}/',
-            config("TAPE_LTO_MOUNTPOINT"),
+            f"{settings.get_settings().tape_preservation_files}/",
+            settings.get_settings().tape_lto_mountpoint,
             _out=process_output,
             _bg=True,
         )
@@ -234,7 +228,7 @@ def read_tape_indicator():
         tape_indicator = (
             tape_server(
                 "find",
-                config("TAPE_LTO_MOUNTPOINT"),
+                settings.get_settings().tape_lto_mountpoint,
                 "-type",
                 "f",
                 "-name",
@@ -255,10 +249,12 @@ def nas_is_mounted():
     """Returns boolean True or False for NAS mounted on TAPE server."""
     # NOTE is_mounted is set as a string from the tape_server() command
     is_mounted = tape_server(
-        f'{config("TAPE_PYTHON3_CMD")} -c \'import os; print(os.path.ismount("{config("TAPE_NAS_ARCHIVES_MOUNTPOINT")}"))\''
+        f"{settings.get_settings().tape_python3_cmd} -c 'import os; print(os.path.ismount(\"{settings.get_settings().tape_nas_archives_mountpoint}\"))'"
     ).strip()
     if is_mounted == "True":
-        logger.info(f'☑️  NAS IS MOUNTED: {config("TAPE_NAS_ARCHIVES_MOUNTPOINT")}')
+        logger.info(
+            f"☑️  NAS IS MOUNTED: {settings.get_settings().tape_nas_archives_mountpoint}"
+        )
         return True
     else:
         return False
@@ -268,18 +264,23 @@ def tape_is_mounted():
     """Returns boolean True or False."""
     # NOTE is_mounted is set as a string
     is_mounted = tape_server(
-        f'{config("TAPE_PYTHON3_CMD")} -c \'import os; print(os.path.ismount("{config("TAPE_LTO_MOUNTPOINT")}"))\''
+        f"{settings.get_settings().tape_python3_cmd} -c 'import os; print(os.path.ismount(\"{settings.get_settings().tape_lto_mountpoint}\"))'"
     ).strip()
     if is_mounted == "True":
-        logger.info(f'☑️  TAPE IS MOUNTED: {config("TAPE_LTO_MOUNTPOINT")}')
+        logger.info(
+            f"☑️  TAPE IS MOUNTED: {settings.get_settings().tape_lto_mountpoint}"
+        )
         return True
     else:
         return False
 
 
 def mount_tape():
-    logger.info(f'🤞 MOUNTING TAPE: {config("TAPE_LTO_MOUNTPOINT")}')
-    tape_server(config("TAPE_LTFS_CMD"), config("TAPE_LTO_MOUNTPOINT"))
+    logger.info(f"🤞 MOUNTING TAPE: {settings.get_settings().tape_lto_mountpoint}")
+    tape_server(
+        settings.get_settings().tape_ltfs_cmd,
+        settings.get_settings().tape_lto_mountpoint,
+    )
 
 
 def mount_nas():
@@ -292,16 +293,16 @@ def mount_nas():
     with open(f"{work_mount_nas_tmpdir}/distillery_tape_mount_nas.sh", "w") as f:
         f.write("#!/bin/bash\n")
         f.write(
-            f'{config("TAPE_NAS_MOUNT_CMD")} //{config("TAPE_NAS_USER")}:{urllib.parse.quote(config("TAPE_NAS_PASS"))}@{config("NAS_IP_ADDRESS")}/{config("NAS_SHARE")} {config("TAPE_NAS_ARCHIVES_MOUNTPOINT")}\n'
+            f"{settings.get_settings().tape_nas_mount_cmd} //{settings.get_settings().tape_nas_user}:{urllib.parse.quote(settings.get_settings().tape_nas_pass)}@{settings.get_settings().nas_ip_address}/{settings.get_settings().nas_share} {settings.get_settings().tape_nas_archives_mountpoint}\n"
         )
     # create a temporary directory on TAPE server
     tape_mount_nas_tmpdir = tape_server("mktemp", "-d").strip()  # macOS
     # rsync WORK server script file to temporary directory on TAPE server
     try:
-        rsync_cmd = sh.Command(config("WORK_RSYNC_CMD"))
+        rsync_cmd = sh.Command(settings.get_settings().work_rsync_cmd)
         rsync_cmd(
             f"{work_mount_nas_tmpdir}/distillery_tape_mount_nas.sh",
-            f"{config('TAPE_SSH_USER')}@{config('TAPE_SSH_HOST')}:{tape_mount_nas_tmpdir}/distillery_tape_mount_nas.sh",
+            f"{settings.get_settings().tape_ssh_user}@{settings.get_settings().tape_ssh_host}:{tape_mount_nas_tmpdir}/distillery_tape_mount_nas.sh",
         )
     except sh.ErrorReturnCode as e:
         print("❌  COULD NOT RSYNC THE SCRIPT FILE TO THE TAPE SERVER")
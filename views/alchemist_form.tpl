@@ -22,6 +22,7 @@
         <label><input type="radio" name="regenerate" value="collection">Regenerate files for a collection</label>
         <label>Collection Identifier<input type="text" name="collection_id"></label>
         <label><input type="radio" name="regenerate" value="all">Regenerate files for all items</label>
+        <label><input type="checkbox" name="incremental" value="incremental">Only regenerate items modified in ArchivesSpace since the last regeneration</label>
       </fieldset>
       <input type="submit" name="regenerate" value="Regenerate">
     </form>
@@ -29,8 +30,10 @@
   <script>
     const component_id = document.querySelector('input[name="component_id"]');
     const collection_id = document.querySelector('input[name="collection_id"]');
+    const incremental = document.querySelector('input[name="incremental"]');
     component_id.parentElement.hidden = true;
     collection_id.parentElement.hidden = true;
+    incremental.parentElement.hidden = true;
     function handleRadioChoice() {
       if (document.querySelector('input[value="one"]').checked) {
         component_id.parentElement.hidden = false;
@@ -38,6 +41,8 @@
         collection_id.parentElement.hidden = true;
         collection_id.required = false;
         collection_id.value = '';
+        incremental.parentElement.hidden = true;
+        incremental.checked = false;
       }
       else if (document.querySelector('input[value="collection"]').checked) {
         component_id.parentElement.hidden = true;
@@ -45,6 +50,7 @@
         component_id.value = '';
         collection_id.parentElement.hidden = false;
         collection_id.required = true;
+        incremental.parentElement.hidden = false;
       }
       else {
         component_id.parentElement.hidden = true;
@@ -53,6 +59,7 @@
         collection_id.parentElement.hidden = true;
         collection_id.required = false;
         collection_id.value = '';
+        incremental.parentElement.hidden = false;
       }
     }
     const radios = document.querySelectorAll('input[name="regenerate"]');
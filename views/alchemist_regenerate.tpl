@@ -29,6 +29,7 @@
       <summary>Details</summary>
       <iframe src="{{distillery_base_url}}/alchemist/regenerate/log/{{component_id}}/{{timestamp}}"></iframe>
     </details>
+    <div><small>Queued as <a href="{{distillery_base_url}}/jobs">job {{job_id}}</a>; it starts when earlier jobs finish.</small></div>
     <div><a href="{{distillery_base_url}}/alchemist">back to form</a></div>
     <script>
       const p = document.getElementsByTagName('p')[0];
@@ -36,30 +37,37 @@
       const details = document.getElementsByTagName('details')[0];
       let id;
 
-      function reloadIframe() {
-        iframe.contentDocument.location.reload();
-        let text = iframe.contentDocument.body.innerText;
-        if (text.indexOf('❌') !== -1) {
-          clearInterval(id);
-          if (p) {
-            p.innerHTML = "❌ Something went wrong. View the details for more information.";
-          }
-        } else if (text.indexOf('🏁') != -1) {
-          clearInterval(id);
-          if (p) {
-            p.innerHTML = p.innerHTML.replace("Regenerating", "✅ Regenerated");
-          }
-        }
+      function checkSummary() {
+        // the summary is the latest event of the job, not the whole log
+        fetch(iframe.src + '?summary', { cache: 'no-store' })
+          .then(response => response.json())
+          .then(summary => {
+            if (summary.state === 'failed') {
+              clearInterval(id);
+              if (p) {
+                p.innerHTML = "❌ Something went wrong. View the details for more information.";
+              }
+            } else if (summary.state === 'succeeded') {
+              clearInterval(id);
+              if (p) {
+                p.innerHTML = p.innerHTML.replace("Regenerating", "✅ Regenerated");
+              }
+            }
+          });
+      }
+
+      function resizeIframe() {
         iframe.style.height = iframe.contentDocument.body.scrollHeight + 48 + 'px';
         iframe.contentWindow.scrollTo(0, iframe.contentDocument.body.scrollHeight);
       }
 
       function updateIframe() {
-        requestAnimationFrame(reloadIframe);
+        requestAnimationFrame(resizeIframe);
       }
 
       details.addEventListener('toggle', updateIframe);
-      id = setInterval(updateIframe, 1000);
+      setInterval(updateIframe, 1000);
+      id = setInterval(checkSummary, 1000);
     </script>
     % end
   </main>
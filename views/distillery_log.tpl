@@ -7,6 +7,9 @@
 <style>p{margin:0.5em}</style>
 </head>
 <body>
+<div id="log">
 % for item in log:
 {{!item}}
 % end
+</div>
+% include("log_tail.tpl", offset=offset, state=state)
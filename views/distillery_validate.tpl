@@ -54,6 +54,7 @@
       <summary>Details</summary>
       <iframe src="{{distillery_base_url}}/validate/log/{{batch_set_id}}"></iframe>
     </details>
+    <div><small>Queued as <a href="{{distillery_base_url}}/jobs">job {{job_id}}</a>; it starts when earlier jobs finish.</small></div>
     <form action="{{distillery_base_url}}/run" method="post">
       <input type="hidden" id="destinations" name="destinations" value="{{destinations}}">
       <input type="hidden" id="batch_set_id" name="batch_set_id" value="{{batch_set_id}}">
@@ -69,39 +70,46 @@
       const details = document.getElementsByTagName('details')[0];
       let id;
 
-      function reloadIframe() {
-        iframe.contentDocument.location.reload();
-        let text = iframe.contentDocument.body.innerText;
-        if (text.indexOf('❌') !== -1) {
-          clearInterval(id);
-          if (p) {
-            p.innerHTML = "❌ Something went wrong. View the details for more information.";
-          }
-          if (button) {
-            button.innerHTML = "❌ Failure";
-            button.setAttribute("aria-busy", false);
-          }
-        } else if (text.indexOf('🈺') != -1) {
-          clearInterval(id);
-          if (p) {
-            p.innerHTML = p.innerHTML.replace("Validating", "✅ Successfully validated");
-          }
-          if (button) {
-            button.innerHTML = "Run 🚀";
-            button.setAttribute("aria-busy", false);
-            button.disabled = false;
-          }
-        }
+      function checkSummary() {
+        // the summary is the latest event of the job, not the whole log
+        fetch(iframe.src + '?summary', { cache: 'no-store' })
+          .then(response => response.json())
+          .then(summary => {
+            if (summary.state === 'failed') {
+              clearInterval(id);
+              if (p) {
+                p.innerHTML = "❌ Something went wrong. View the details for more information.";
+              }
+              if (button) {
+                button.innerHTML = "❌ Failure";
+                button.setAttribute("aria-busy", false);
+              }
+            } else if (summary.state === 'succeeded') {
+              clearInterval(id);
+              if (p) {
+                p.innerHTML = p.innerHTML.replace("Validating", "✅ Successfully validated");
+              }
+              if (button) {
+                button.innerHTML = "Run 🚀";
+                button.setAttribute("aria-busy", false);
+                button.disabled = false;
+              }
+            }
+          });
+      }
+
+      function resizeIframe() {
         iframe.style.height = iframe.contentDocument.body.scrollHeight + 48 + 'px';
         iframe.contentWindow.scrollTo(0, iframe.contentDocument.body.scrollHeight);
       }
 
       function updateIframe() {
-        requestAnimationFrame(reloadIframe);
+        requestAnimationFrame(resizeIframe);
       }
 
       details.addEventListener('toggle', updateIframe);
-      id = setInterval(updateIframe, 1000);
+      setInterval(updateIframe, 1000);
+      id = setInterval(checkSummary, 1000);
     </script>
     <hr>
     <footer>
@@ -0,0 +1,63 @@
+<!DOCTYPE html>
+<html lang="en">
+
+<head>
+  <meta charset="utf-8">
+  <meta name="viewport" content="width=device-width">
+  <title>Jobs | Distillery</title>
+  <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/@picocss/pico@next/css/pico.min.css">
+  <style type="text/css">
+    td form { margin: 0; }
+    td button { padding: 0.25em 0.5em; }
+  </style>
+</head>
+
+<body>
+  <main class="container">
+    <header>
+      <h1>Jobs</h1>
+    </header>
+    <table>
+      <thead>
+        <tr>
+          <th>Job</th>
+          <th>Type</th>
+          <th>Arguments</th>
+          <th>State</th>
+          <th>Queued</th>
+          <th></th>
+        </tr>
+      </thead>
+      <tbody>
+        % import datetime, json
+        % for job in jobs:
+        <tr>
+          <td>{{job["id"]}}</td>
+          <td>{{job["type"]}}</td>
+          <td><small>{{", ".join(f"{key}: {value}" for key, value in json.loads(job["kwargs"]).items() if key != "logfile")}}</small></td>
+          <td>{{job["state"]}}{{f' ({job["error"]})' if job["error"] else ""}}</td>
+          <td>{{datetime.datetime.fromtimestamp(job["created"]).isoformat(sep=" ", timespec="seconds")}}</td>
+          <td>
+            % if job["state"] in ["queued", "running"]:
+            <form action="{{distillery_base_url}}/jobs/{{job['id']}}/cancel" method="post">
+              <button class="secondary outline">Cancel</button>
+            </form>
+            % elif job["type"] == "run" and job["state"] in ["failed", "cancelled"] and job["started"]:
+            % kwargs = json.loads(job["kwargs"])
+            <form action="{{distillery_base_url}}/run" method="post">
+              <input type="hidden" name="destinations" value="{{kwargs['destinations']}}">
+              <input type="hidden" name="batch_set_id" value="{{kwargs['batch_set_id']}}">
+              <input type="hidden" name="resume" value="1">
+              <button class="secondary outline">Resume</button>
+            </form>
+            % end
+          </td>
+        </tr>
+        % end
+      </tbody>
+    </table>
+    <div><a href="{{distillery_base_url}}">back to form</a></div>
+  </main>
+</body>
+
+</html>
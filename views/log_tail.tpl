@@ -0,0 +1,50 @@
+<script>
+  // append new lines to the log instead of reloading the whole document
+  (function () {
+    const log = document.getElementById('log');
+    let offset = {{offset}};
+    let state = '{{state}}';
+    let drained = false;
+    function finished() {
+      return ['failed', 'succeeded'].includes(state);
+    }
+    function tail() {
+      if (finished()) {
+        // read once more for lines written after the final message
+        if (drained) {
+          return;
+        }
+        drained = true;
+      }
+      fetch(location.pathname + '?offset=' + offset, { cache: 'no-store' })
+        .then(response => response.json())
+        .then(data => {
+          log.insertAdjacentHTML('beforeend', data.lines.join(''));
+          offset = data.offset;
+          state = data.state;
+        })
+        .finally(() => setTimeout(tail, 1000));
+    }
+    if (finished()) {
+      return;
+    }
+    if (!window.EventSource) {
+      setTimeout(tail, 1000);
+      return;
+    }
+    // lines are pushed as they are written; fall back to polling by offset
+    const source = new EventSource(location.pathname + '?offset=' + offset);
+    source.onmessage = function (event) {
+      log.insertAdjacentHTML('beforeend', event.data + '\n');
+      offset = Number(event.lastEventId);
+    };
+    source.addEventListener('end', function () {
+      source.close();
+    });
+    source.onerror = function () {
+      if (source.readyState === EventSource.CLOSED) {
+        setTimeout(tail, 1000);
+      }
+    };
+  })();
+</script>
@@ -60,27 +60,25 @@
     <hr>
     <iframe id="log" src="{{distillery_base_url}}/oralhistories/log/{{component_id}}/{{timestamp}}/{{op}}"></iframe>
     <script>
+      const l = document.getElementById('log');
       const id = setInterval(function () {
-        let l = document.getElementById('log');
         let d = l.contentDocument;
-        d.location.reload();
-        if (d.body.innerText.includes('🏁')) {
-          // stop reloading
-          clearInterval(id);
+        if (d.body.scrollHeight > 0) {
+          // add 48px to fit next item as it loads
+          l.style.height = d.body.scrollHeight + 48 + 'px';
+          // scroll to bottom
+          l.contentWindow.scrollTo(0, d.body.scrollHeight);
         }
-        else if (d.body.innerText.includes('❌')) {
-          // stop reloading
-          clearInterval(id);
-        };
-        l.addEventListener('load', function() {
-          if (l.contentDocument.body.scrollHeight > 0) {
-            // add 48px to fit next item as it loads
-            l.style.height = l.contentDocument.body.scrollHeight + 48 + 'px';
-            // scroll to bottom
-            this.contentWindow.scrollTo(0, l.contentDocument.body.scrollHeight);
-          }
-        });
-      // reload every second
+        // the summary is the latest event of the job, not the whole log
+        fetch(l.src + '?summary', { cache: 'no-store' })
+          .then(response => response.json())
+          .then(summary => {
+            if (['failed', 'succeeded'].includes(summary.state)) {
+              // stop checking
+              clearInterval(id);
+            }
+          });
+      // check every second; the log appends new lines itself
       }, 1000);
     </script>
   </main>
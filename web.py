@@ -8,6 +8,8 @@
 from gevent import monkey; monkey.patch_all()
 # fmt: on
 
+import bisect
+import functools
 import json
 import logging.config
 import os
@@ -17,6 +19,9 @@ from csv import DictReader
 from pathlib import Path
 
 import bottle
+import gevent
+import gevent.event
+import gevent.monkey
 import rpyc
 
 from decouple import config
@@ -51,11 +56,13 @@ def distillery_form():
 @bottle.route("/validate", method="POST")
 def distillery_validate():
     try:
-        distillery_work_server_connection = rpyc.connect(
-            config("WORK_HOSTNAME"), config("DISTILLERY_RPYC_PORT")
-        )
+        distillery_work_server_connection = get_rpyc_pool(
+            config("DISTILLERY_RPYC_PORT")
+        ).acquire()
     except ConnectionRefusedError:
         return f'<h1>Connection Refused</h1><p>There was a problem connecting to <code>{config("WORK_HOSTNAME")}</code>. Please contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
+    except RPyCPoolExhausted:
+        return f'<h1>Busy</h1><p>Too many jobs are running on <code>{config("WORK_HOSTNAME")}</code>. Please try again later or contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
     except:
         raise
     destinations = {}
@@ -72,58 +79,79 @@ def distillery_validate():
         destinations["access"]["thumbnail_label"] = bottle.request.forms.get(
             "thumbnail_label"
         )
-    # asynchronously validate on WORK server
-    distillery_validate = rpyc.async_(distillery_work_server_connection.root.validate)
-    async_result = distillery_validate(json.dumps(destinations), batch_set_id)
+    # queue validation on WORK server ahead of longer jobs
+    job_id = get_rpyc_pool(config("DISTILLERY_RPYC_PORT")).call(
+        distillery_work_server_connection,
+        "enqueue",
+        "validate",
+        json.dumps(
+            {"destinations": json.dumps(destinations), "batch_set_id": batch_set_id}
+        ),
+        10,
+    )
     return bottle.template(
         "distillery_validate",
         distillery_base_url=config("DISTILLERY_BASE_URL").rstrip("/"),
         user=authorize_user(),
         destinations=json.dumps(destinations),
         batch_set_id=batch_set_id,
+        job_id=job_id,
     )
 
 
 @bottle.route("/validate/log/<batch_set_id>")
 def distillery_validate_log(batch_set_id):
-    with open(
+    return log_response(
         Path(config("WEB_LOG_FILES")).joinpath(f"{batch_set_id}.validate.log"),
-        encoding="utf-8",
-    ) as f:
-        return bottle.template("distillery_log", log=f.readlines())
+        "distillery_log",
+    )
 
 
 @bottle.route("/run", method="POST")
 def distillery_run():
     try:
-        distillery_work_server_connection = rpyc.connect(
-            config("WORK_HOSTNAME"), config("DISTILLERY_RPYC_PORT")
-        )
+        distillery_work_server_connection = get_rpyc_pool(
+            config("DISTILLERY_RPYC_PORT")
+        ).acquire()
     except ConnectionRefusedError:
         return f'<h1>Connection Refused</h1><p>There was a problem connecting to <code>{config("WORK_HOSTNAME")}</code>. Please contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
+    except RPyCPoolExhausted:
+        return f'<h1>Busy</h1><p>Too many jobs are running on <code>{config("WORK_HOSTNAME")}</code>. Please try again later or contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
     except:
         raise
     destinations = json.loads(bottle.request.forms.get("destinations"))
     batch_set_id = bottle.request.forms.get("batch_set_id")
-    # asynchronously run on WORK server
-    distillery_run = rpyc.async_(distillery_work_server_connection.root.run)
-    async_result = distillery_run(json.dumps(destinations), batch_set_id)
+    # NOTE resume continues a failed or cancelled run from its journal
+    resume = bool(bottle.request.forms.get("resume"))
+    # queue run on WORK server
+    job_id = get_rpyc_pool(config("DISTILLERY_RPYC_PORT")).call(
+        distillery_work_server_connection,
+        "enqueue",
+        "run",
+        json.dumps(
+            {
+                "destinations": json.dumps(destinations),
+                "batch_set_id": batch_set_id,
+                "resume": resume,
+            }
+        ),
+    )
     return bottle.template(
         "distillery_run",
         distillery_base_url=config("DISTILLERY_BASE_URL").rstrip("/"),
         user=authorize_user(),
         destinations=json.dumps(destinations),
         batch_set_id=batch_set_id,
+        job_id=job_id,
     )
 
 
 @bottle.route("/run/log/<batch_set_id>")
 def distillery_run_log(batch_set_id):
-    with open(
+    return log_response(
         Path(config("WEB_LOG_FILES")).joinpath(f"{batch_set_id}.run.log"),
-        encoding="utf-8",
-    ) as f:
-        return bottle.template("distillery_log", log=f.readlines())
+        "distillery_log",
+    )
 
 
 @bottle.route("/alchemist")
@@ -138,25 +166,31 @@ def alchemist_form():
 @bottle.route("/alchemist/regenerate", method="POST")
 def alchemist_regenerate():
     try:
-        distillery_work_server_connection = rpyc.connect(
-            config("WORK_HOSTNAME"), config("DISTILLERY_RPYC_PORT")
-        )
+        distillery_work_server_connection = get_rpyc_pool(
+            config("DISTILLERY_RPYC_PORT")
+        ).acquire()
     except ConnectionRefusedError:
         return f'<h1>Connection Refused</h1><p>There was a problem connecting to <code>{config("WORK_HOSTNAME")}</code>. Please contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
+    except RPyCPoolExhausted:
+        return f'<h1>Busy</h1><p>Too many jobs are running on <code>{config("WORK_HOSTNAME")}</code>. Please try again later or contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
     except:
         raise
     timestamp = str(int(time.time()))
-    # asynchronously run on WORK server
-    distillery_alchemist_regenerate = rpyc.async_(
-        distillery_work_server_connection.root.alchemist_regenerate
+    # queue on WORK server
+    distillery_alchemist_regenerate = functools.partial(
+        get_rpyc_pool(config("DISTILLERY_RPYC_PORT")).call,
+        distillery_work_server_connection,
+        "enqueue",
+        "alchemist_regenerate",
     )
     if bottle.request.forms.get("component_id"):
         component_id = bottle.request.forms.get("component_id")
         logfile = Path(config("WEB_LOG_FILES")).joinpath(
             f"{component_id}.{timestamp}.alchemist_regenerate.log"
         )
-        async_result = distillery_alchemist_regenerate(
-            component_id=component_id, logfile=str(logfile)
+        # NOTE one item is quick, so it goes ahead of whole collections
+        job_id = distillery_alchemist_regenerate(
+            json.dumps({"component_id": component_id, "logfile": str(logfile)}), 10
         )
         return bottle.template(
             "alchemist_regenerate",
@@ -165,14 +199,21 @@ def alchemist_regenerate():
             user=authorize_user(),
             component_id=component_id,
             timestamp=timestamp,
+            job_id=job_id,
         )
     elif bottle.request.forms.get("collection_id"):
         collection_id = bottle.request.forms.get("collection_id")
         logfile = Path(config("WEB_LOG_FILES")).joinpath(
             f"{collection_id}.{timestamp}.alchemist_regenerate.log"
         )
-        async_result = distillery_alchemist_regenerate(
-            collection_id=collection_id, logfile=str(logfile)
+        job_id = distillery_alchemist_regenerate(
+            json.dumps(
+                {
+                    "collection_id": collection_id,
+                    "logfile": str(logfile),
+                    "incremental": bool(bottle.request.forms.get("incremental")),
+                }
+            )
         )
         return bottle.template(
             "alchemist_regenerate",
@@ -181,30 +222,79 @@ def alchemist_regenerate():
             user=authorize_user(),
             component_id=collection_id,
             timestamp=timestamp,
+            job_id=job_id,
         )
     else:
         logfile = Path(config("WEB_LOG_FILES")).joinpath(
             f"_.{timestamp}.alchemist_regenerate.log"
         )
-        async_result = distillery_alchemist_regenerate(logfile=str(logfile))
+        job_id = distillery_alchemist_regenerate(
+            json.dumps(
+                {
+                    "logfile": str(logfile),
+                    "incremental": bool(bottle.request.forms.get("incremental")),
+                }
+            )
+        )
         return bottle.template(
             "alchemist_regenerate",
             distillery_base_url=config("DISTILLERY_BASE_URL").rstrip("/"),
             user=authorize_user(),
             component_id="_",
             timestamp=timestamp,
+            job_id=job_id,
         )
 
 
 @bottle.route("/alchemist/regenerate/log/<component_id>/<timestamp>")
 def alchemist_regenerate_log(component_id, timestamp):
-    with open(
+    return log_response(
         Path(config("WEB_LOG_FILES")).joinpath(
             f"{component_id}.{timestamp}.alchemist_regenerate.log"
         ),
-        encoding="utf-8",
-    ) as f:
-        return bottle.template("alchemist_regenerate_log", log=f.readlines())
+        "alchemist_regenerate_log",
+    )
+
+
+@bottle.route("/jobs")
+def jobs():
+    try:
+        distillery_work_server_connection = get_rpyc_pool(
+            config("DISTILLERY_RPYC_PORT")
+        ).acquire()
+    except ConnectionRefusedError:
+        return f'<h1>Connection Refused</h1><p>There was a problem connecting to <code>{config("WORK_HOSTNAME")}</code>. Please contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
+    except RPyCPoolExhausted:
+        return f'<h1>Busy</h1><p>Too many jobs are running on <code>{config("WORK_HOSTNAME")}</code>. Please try again later or contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
+    except:
+        raise
+    return bottle.template(
+        "jobs",
+        distillery_base_url=config("DISTILLERY_BASE_URL").rstrip("/"),
+        user=authorize_user(),
+        jobs=json.loads(
+            get_rpyc_pool(config("DISTILLERY_RPYC_PORT")).call(
+                distillery_work_server_connection, "jobs"
+            )
+        ),
+    )
+
+
+@bottle.route("/jobs/<job_id:int>/cancel", method="POST")
+def jobs_cancel(job_id):
+    authorize_user()
+    try:
+        distillery_work_server_connection = get_rpyc_pool(
+            config("DISTILLERY_RPYC_PORT")
+        ).acquire()
+    except ConnectionRefusedError:
+        return f'<h1>Connection Refused</h1><p>There was a problem connecting to <code>{config("WORK_HOSTNAME")}</code>. Please contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
+    except RPyCPoolExhausted:
+        return f'<h1>Busy</h1><p>Too many jobs are running on <code>{config("WORK_HOSTNAME")}</code>. Please try again later or contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
+    get_rpyc_pool(config("DISTILLERY_RPYC_PORT")).call(
+        distillery_work_server_connection, "cancel", job_id
+    )
+    bottle.redirect(f'{config("DISTILLERY_BASE_URL").rstrip("/")}/jobs')
 
 
 @bottle.route("/oralhistories")
@@ -221,9 +311,14 @@ def oralhistories_form():
 
 @bottle.route("/oralhistories", method="POST")
 def oralhistories_post():
-    oralhistories_work_server_connection = rpyc.connect(
-        config("WORK_HOSTNAME"), config("ORALHISTORIES_RPYC_PORT")
-    )
+    try:
+        oralhistories_work_server_connection = get_rpyc_pool(
+            config("ORALHISTORIES_RPYC_PORT")
+        ).acquire()
+    except ConnectionRefusedError:
+        return f'<h1>Connection Refused</h1><p>There was a problem connecting to <code>{config("WORK_HOSTNAME")}</code>. Please contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
+    except RPyCPoolExhausted:
+        return f'<h1>Busy</h1><p>Too many jobs are running on <code>{config("WORK_HOSTNAME")}</code>. Please try again later or contact {config("DISTILLERY_DEVELOPER_CONTACT", default="Digital Library Development")} for assistance.</p>'
     timestamp = str(int(time.time()))
     if bottle.request.forms.get("upload"):
         op = "UPLOAD"
@@ -238,8 +333,10 @@ def oralhistories_post():
                 config("ORALHISTORIES_WEB_UPLOADS"), overwrite=True
             )  # appends upload.filename automatically
             # asynchronously run process on WORK server
-            oralhistories_run = rpyc.async_(
-                oralhistories_work_server_connection.root.run
+            oralhistories_run = functools.partial(
+                get_rpyc_pool(config("ORALHISTORIES_RPYC_PORT")).dispatch,
+                oralhistories_work_server_connection,
+                "run",
             )
             async_result = oralhistories_run(
                 component_id=component_id, logfile=str(logfile)
@@ -259,7 +356,11 @@ def oralhistories_post():
     if bottle.request.forms.get("publish"):
         op = "PUBLISH"
         # asynchronously run process on WORK server
-        oralhistories_run = rpyc.async_(oralhistories_work_server_connection.root.run)
+        oralhistories_run = functools.partial(
+            get_rpyc_pool(config("ORALHISTORIES_RPYC_PORT")).dispatch,
+            oralhistories_work_server_connection,
+            "run",
+        )
         if bottle.request.forms.get("component_id_publish"):
             component_id = bottle.request.forms.get("component_id_publish")
             logfile = Path(config("WEB_LOG_FILES")).joinpath(
@@ -291,7 +392,11 @@ def oralhistories_post():
     if bottle.request.forms.get("update"):
         op = "UPDATE"
         # asynchronously run process on WORK server
-        oralhistories_run = rpyc.async_(oralhistories_work_server_connection.root.run)
+        oralhistories_run = functools.partial(
+            get_rpyc_pool(config("ORALHISTORIES_RPYC_PORT")).dispatch,
+            oralhistories_work_server_connection,
+            "run",
+        )
         if bottle.request.forms.get("component_id_update"):
             component_id = bottle.request.forms.get("component_id_update")
             logfile = Path(config("WEB_LOG_FILES")).joinpath(
@@ -325,11 +430,348 @@ def oralhistories_post():
 
 @bottle.route("/oralhistories/log/<component_id>/<timestamp>/<op>")
 def oralhistories_log(component_id, timestamp, op):
-    with open(
+    return log_response(
         Path(config("WEB_LOG_FILES")).joinpath(f"{component_id}.{timestamp}.{op}.log"),
-        encoding="utf-8",
-    ) as f:
-        return bottle.template("oralhistories_log", log=f.readlines())
+        "oralhistories_log",
+    )
+
+
+class RPyCPoolExhausted(Exception):
+    pass
+
+
+class RPyCPool:
+    """Reuse RPyC connections to one service on the WORK server.
+
+    A connection is checked out for each request and returned to the pool
+    once the service call it was used for has finished, because the WORK
+    server handles the calls on one connection one at a time. The number of
+    connections is capped so the ThreadedServer does not accumulate threads,
+    idle connections are pinged to keep them alive, and broken connections
+    are replaced automatically.
+
+    Waiting for replies and pinging happen in native threads, because under
+    mod_wsgi nothing runs the gevent hub of a request once it has finished.
+    A dispatched call gives up its slot once it is sent; its connection is
+    returned to the pool when the reply arrives.
+    """
+
+    def __init__(self, hostname, port):
+        self.hostname = hostname
+        self.port = port
+        self.size = config("RPYC_POOL_SIZE", default=8, cast=int)
+        # list of (connection, time last used)
+        self.idle = []
+        # connections that may be checked out
+        self.slots = self.size
+        # guards self.idle and self.slots, which the native threads share
+        self.lock = allocate_native_lock()
+        self.keepalive_interval = config(
+            "RPYC_KEEPALIVE_INTERVAL", default=60, cast=int
+        )
+        start_native_thread(self.keep_alive)
+
+    def acquire(self):
+        deadline = time.time() + config("RPYC_POOL_TIMEOUT", default=10, cast=int)
+        # NOTE poll so waiting does not block the hub of the gevent server
+        while True:
+            with self.lock:
+                if self.slots:
+                    self.slots -= 1
+                    break
+            if time.time() > deadline:
+                raise RPyCPoolExhausted(f"{self.hostname}:{self.port}")
+            gevent.sleep(0.1)
+        connection = None
+        while connection is None:
+            with self.lock:
+                if not self.idle:
+                    break
+                connection, last_used = self.idle.pop()
+            if connection.closed:
+                connection = None
+            elif time.time() - last_used > self.keepalive_interval:
+                try:
+                    connection.ping()
+                except Exception:
+                    logger.warning(f"⚠️  RECONNECTING: {self.hostname}:{self.port}")
+                    close_rpyc_connection(connection)
+                    connection = None
+        if connection is None:
+            try:
+                connection = rpyc.connect(self.hostname, self.port)
+            except:
+                self.release_slot()
+                raise
+        # release the connection if the request never dispatches a call
+        bottle.request.environ.setdefault("distillery.rpyc", []).append(
+            (self, connection)
+        )
+        return connection
+
+    def release(self, connection):
+        self.return_connection(connection)
+        self.release_slot()
+
+    def release_slot(self):
+        with self.lock:
+            self.slots += 1
+
+    def return_connection(self, connection):
+        """Keep a connection for reuse unless it is closed or the pool is full."""
+        if not connection.closed:
+            with self.lock:
+                if len(self.idle) < self.size:
+                    self.idle.append((connection, time.time()))
+                    return
+        close_rpyc_connection(connection)
+
+    def dispatch(self, connection, name, *args, **kwargs):
+        """Call an exposed method asynchronously and return the AsyncResult."""
+        bottle.request.environ["distillery.rpyc"].remove((self, connection))
+        try:
+            async_result = rpyc.async_(getattr(connection.root, name))(*args, **kwargs)
+        except:
+            close_rpyc_connection(connection)
+            self.release_slot()
+            raise
+        # NOTE the call is a job on the WORK server now, not a waiting request
+        self.release_slot()
+        start_native_thread(self.release_when_ready, connection, name, async_result)
+        return async_result
+
+    def call(self, connection, name, *args, **kwargs):
+        """Call an exposed method, wait for the result and release the connection."""
+        bottle.request.environ["distillery.rpyc"].remove((self, connection))
+        try:
+            return getattr(connection.root, name)(*args, **kwargs)
+        finally:
+            self.release(connection)
+
+    def release_when_ready(self, connection, name, async_result):
+        try:
+            # NOTE serves the connection until the reply arrives
+            async_result.wait()
+            if async_result.error:
+                logger.error(f"❌ {name.upper()} FAILED ON WORK SERVER")
+        except Exception:
+            logger.exception("‼️")
+            close_rpyc_connection(connection)
+        self.return_connection(connection)
+
+    def keep_alive(self):
+        while True:
+            gevent.sleep(self.keepalive_interval)
+            # NOTE take the connections off the idle list so acquire() cannot
+            # hand one out while it is being pinged
+            with self.lock:
+                idle, self.idle = self.idle, []
+            for connection, last_used in idle:
+                try:
+                    connection.ping()
+                except Exception:
+                    close_rpyc_connection(connection)
+                    continue
+                with self.lock:
+                    self.idle.append((connection, last_used))
+
+
+# NOTE gevent locks belong to the hub of one thread, so state shared with
+# native threads is guarded by locks of the operating system
+allocate_native_lock = gevent.monkey.get_original("_thread", "allocate_lock")
+
+
+def start_native_thread(function, *args):
+    """Run a function in an operating system thread with a gevent hub of its own."""
+    # NOTE load the event loop here; hubs created at the same time in several
+    # threads can deadlock importing it
+    gevent.get_hub()
+    gevent.monkey.get_original("_thread", "start_new_thread")(function, args)
+
+
+rpyc_pools = {}
+rpyc_pools_lock = allocate_native_lock()
+
+
+def get_rpyc_pool(port):
+    key = (config("WORK_HOSTNAME"), int(port))
+    with rpyc_pools_lock:
+        if key not in rpyc_pools:
+            rpyc_pools[key] = RPyCPool(*key)
+        return rpyc_pools[key]
+
+
+def close_rpyc_connection(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+@bottle.hook("after_request")
+def release_rpyc_connections():
+    for pool, connection in bottle.request.environ.pop("distillery.rpyc", []):
+        pool.release(connection)
+
+
+def log_response(logfile, template):
+    """Return the rendered log or, with an offset query, only the new lines.
+
+    With ?offset=N the response is JSON containing the complete lines written
+    after byte N, the offset to request next and the state of the job. With
+    ?summary the response is the latest event of the job. An EventSource
+    request gets a stream of the lines instead when the server is gevent.
+    """
+    if "text/event-stream" in bottle.request.get_header("Accept", ""):
+        if bottle.request.environ.get("wsgi.multithread"):
+            # NOTE a stream holds a server thread, as with mod_wsgi, for the
+            # whole job; 204 closes the EventSource and the page polls instead
+            bottle.response.status = 204
+            return ""
+        bottle.response.content_type = "text/event-stream"
+        bottle.response.set_header("Cache-Control", "no-cache")
+        # NOTE prevent proxies from buffering the stream
+        bottle.response.set_header("X-Accel-Buffering", "no")
+        return stream_log_events(
+            logfile,
+            int(
+                bottle.request.get_header("Last-Event-ID")
+                or bottle.request.query.get("offset")
+                or 0
+            ),
+        )
+    if "summary" in bottle.request.query:
+        bottle.response.set_header("Cache-Control", "no-store")
+        return read_log_summary(logfile)
+    if bottle.request.query.get("offset"):
+        lines, offset = read_log_lines(logfile, int(bottle.request.query.offset))
+        bottle.response.set_header("Cache-Control", "no-store")
+        return {
+            "lines": lines,
+            "offset": offset,
+            "state": read_log_summary(logfile)["state"],
+        }
+    lines, offset = read_log_lines(logfile)
+    return bottle.template(
+        template, log=lines, offset=offset, state=read_log_summary(logfile)["state"]
+    )
+
+
+def read_log_lines(logfile, offset=0):
+    """Return complete lines after the byte offset and the offset following them."""
+    try:
+        with open(logfile, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        # NOTE the WORK server may not have created the log file yet
+        return [], offset
+    # leave a partially written line for the next request
+    end = data.rfind(b"\n") + 1
+    return data[:end].decode("utf-8").splitlines(keepends=True), offset + end
+
+
+def read_log_summary(logfile):
+    """Return the latest event from the JSON-lines event log of a status log.
+
+    Only the end of the file is read, so checking on a job costs the same no
+    matter how long it has been running.
+    """
+    try:
+        with open(Path(logfile).with_suffix(".jsonl"), "rb") as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            f.seek(max(0, end - 65536))
+            data = f.read()
+    except FileNotFoundError:
+        # NOTE the job has not started writing events yet
+        return {"state": "queued"}
+    # ignore a partially written line
+    lines = data[: data.rfind(b"\n") + 1].splitlines()
+    if not lines:
+        return {"state": "running"}
+    return json.loads(lines[-1])
+
+
+class LogFeed:
+    """Follow one log file and share new lines with every subscriber.
+
+    A single greenlet reads the file while anyone is subscribed, so many
+    browsers watching the same job do not each poll the shared mount. Once
+    the job has ended the feed stops when the file has been quiet for a
+    second, so the lines written after the final message are not lost.
+    """
+
+    def __init__(self, logfile):
+        self.logfile = logfile
+        self.lines = []
+        # byte offset following each line
+        self.offsets = []
+        self.offset = 0
+        self.finished = False
+        self.subscribers = 0
+        self.updated = gevent.event.Event()
+
+    def watch(self):
+        ended = False
+        while self.subscribers and not self.finished:
+            lines, offset = read_log_lines(self.logfile, self.offset)
+            if lines:
+                for line in lines:
+                    self.offset += len(line.encode("utf-8"))
+                    self.offsets.append(self.offset)
+                    self.lines.append(line.rstrip("\r\n"))
+                self.notify()
+            elif ended:
+                # NOTE nothing was written since the job ended
+                self.finished = True
+                break
+            ended = read_log_summary(self.logfile)["state"] in ["failed", "succeeded"]
+            gevent.sleep(1)
+        self.notify()
+
+    def notify(self):
+        updated, self.updated = self.updated, gevent.event.Event()
+        updated.set()
+
+    def lines_after(self, offset):
+        """Return (offset, line) pairs for lines ending after the byte offset."""
+        start = bisect.bisect_right(self.offsets, offset)
+        return list(zip(self.offsets[start:], self.lines[start:]))
+
+
+# logfile: LogFeed
+log_feeds = {}
+
+
+def stream_log_events(logfile, offset=0):
+    """Yield server-sent events for lines written after the byte offset."""
+    # NOTE only served by the gevent server, where every request shares
+    # one hub, so there is one feed per log file
+    feed = log_feeds.get(logfile)
+    if not feed:
+        feed = log_feeds[logfile] = LogFeed(logfile)
+    feed.subscribers += 1
+    if feed.subscribers == 1:
+        gevent.spawn(feed.watch)
+    try:
+        yield "retry: 1000\n\n"
+        while True:
+            updated = feed.updated
+            for offset, line in feed.lines_after(offset):
+                yield f"id: {offset}\ndata: {line}\n\n"
+            if feed.finished:
+                yield "event: end\ndata: \n\n"
+                return
+            if not updated.wait(
+                timeout=config("WEB_EVENTS_KEEPALIVE", default=15, cast=int)
+            ):
+                # keep idle connections open through proxies
+                yield ": keepalive\n\n"
+    finally:
+        feed.subscribers -= 1
+        if not feed.subscribers and log_feeds.get(logfile) is feed:
+            del log_feeds[logfile]
 
 
 def authorize_user():
@@ -338,18 +780,36 @@ def authorize_user():
         return debug_user
     elif bottle.request.environ.get("REMOTE_USER", None):
         # REMOTE_USER is an email address in Shibboleth
-        email_address = bottle.request.environ["REMOTE_USER"]
-        # we check the username against our authorized users.csv file
-        with open(Path(__file__).parent.resolve().joinpath("users.csv")) as csvfile:
-            users = DictReader(csvfile)
-            for user in users:
-                if user["email_address"] == email_address:
-                    return user
+        if "distillery.user" not in bottle.request.environ:
+            # we check the username against our authorized users.csv file
+            bottle.request.environ["distillery.user"] = get_authorized_users().get(
+                bottle.request.environ["REMOTE_USER"]
+            )
+        if bottle.request.environ["distillery.user"]:
+            return bottle.request.environ["distillery.user"]
         bottle.abort(403)
     else:
         bottle.abort(403)
 
 
+authorized_users = {"mtime": None, "users": {}}
+
+
+def get_authorized_users():
+    """Return users.csv rows keyed by email address, reloading when it changes."""
+    users_csv = Path(__file__).parent.resolve().joinpath("users.csv")
+    mtime = users_csv.stat().st_mtime
+    if mtime != authorized_users["mtime"]:
+        users = {}
+        with open(users_csv) as csvfile:
+            for user in DictReader(csvfile):
+                # NOTE the first row for an email address wins
+                users.setdefault(user["email_address"], user)
+        authorized_users["users"] = users
+        authorized_users["mtime"] = mtime
+    return authorized_users["users"]
+
+
 if __name__ == "__main__":
     # supply a user when running bottle locally
     debug_user = {"email_address": "hello@example.com", "display_name": "World"}